@@ -6,12 +6,14 @@ Generic main entry point that outputs structured insights from all configured sc
 import sys
 import asyncio
 import argparse
-import json
-from typing import List
+import orjson
+from typing import AsyncIterable, AsyncIterator, Callable, Dict, List, Optional, Tuple
 from colorama import Fore, Style, init
+from pydantic import BaseModel
 
 from src.config import config, ScenarioDefinition
-from src.agent import get_agent_for_scenario
+from src.agent import close_agents, get_agent_for_scenario, warm_agents
+from src.pipeline import analyze_stream
 from src.whatsapp_scanner import WhatsAppScanner, Message
 
 # Initialize colorama
@@ -19,142 +21,219 @@ init(autoreset=True)
 
 def print_banner():
     """Print application banner."""
-    print(f"\n{Fore.CYAN}{'='*80}")
-    print(f"{'WhatsApp Multi-Scenario Group Monitor':^80}")
-    print(f"{'='*80}{Style.RESET_ALL}\n")
+    print(f"\n{Fore.CYAN}{'='*80}", file=sys.stderr)
+    print(f"{'WhatsApp Multi-Scenario Group Monitor':^80}", file=sys.stderr)
+    print(f"{'='*80}{Style.RESET_ALL}\n", file=sys.stderr)
 
-async def analyze_messages(messages: List[Message], group_name: str, scenario: ScenarioDefinition, limit: int = None):
+def _message_context(msg: Message, group_name: str) -> dict:
+    """Message fields included with every result."""
+    return {
+        "timestamp": msg.timestamp,
+        "group_name": group_name,
+        "sender": msg.sender,
+        "phone_number": msg.phone_number,
+        "text": msg.text
+    }
+
+def build_result(group_name: str, scenario: ScenarioDefinition, msg: Message, analysis: BaseModel) -> dict:
+    """Create result dict with message context and analysis."""
+    return {
+        "message": _message_context(msg, group_name),
+        "scenario": scenario.name,
+        "analysis": analysis.model_dump()
+    }
+
+def emit_ndjson(group_name: str, scenario: ScenarioDefinition, msg: Message, analysis: BaseModel):
+    """
+    Write a single result to stdout as one JSON line.
+    
+    The analysis is serialized straight from the Pydantic model, skipping the
+    intermediate dict that build_result() creates.
+    """
+    line = b"".join((
+        b'{"message":', orjson.dumps(_message_context(msg, group_name)),
+        b',"scenario":', orjson.dumps(scenario.name),
+        b',"analysis":', analysis.model_dump_json().encode("utf-8"),
+        b"}\n"
+    ))
+    _write_stdout_bytes(line)
+
+def encode_result_indented(group_name: str, scenario: ScenarioDefinition, msg: Message, analysis: BaseModel) -> bytes:
+    """
+    Encode a result as it will appear inside the final indented JSON array.
+    
+    Keeping encoded bytes instead of nested dicts until the scan finishes keeps
+    memory per result small; the dict only lives for the duration of the call.
+    """
+    encoded = orjson.dumps(build_result(group_name, scenario, msg, analysis), option=orjson.OPT_INDENT_2)
+    # JSON strings never contain raw newlines, so this only indents structure
+    return b"  " + encoded.replace(b"\n", b"\n  ")
+
+def _write_stdout_bytes(data: bytes):
+    """Write already-encoded UTF-8 bytes to stdout, keeping order with print()."""
+    sys.stdout.flush()
+    sys.stdout.buffer.write(data)
+    sys.stdout.buffer.flush()
+
+async def analyze_messages(messages: AsyncIterable[Message], group_name: str, scenario: ScenarioDefinition, limit: int = None, concurrency: int = 8, batch_size: int = 8,
+                           on_result: Optional[Callable[[Message, BaseModel], None]] = None):
     """
-    Analyze messages with AI agent and return structured results.
+    Analyze messages with AI agent as they arrive and return structured results.
     
     Args:
-        messages: List of messages to analyze
+        messages: Async stream of messages to analyze
         group_name: Name of the WhatsApp group
         scenario: ScenarioDefinition guiding the analysis
         limit: Maximum number of messages to analyze (None for no limit)
+        concurrency: Maximum number of in-flight requests to the model
+        batch_size: Number of messages sent to the model in a single request
+        on_result: Optional callback invoked with each (message, analysis) as soon as it is ready;
+            results handed to it are not kept
         
     Returns:
-        List of analysis results (Pydantic model instances)
+        List of (message, analysis) pairs, in the order the messages arrived (empty with on_result)
     """
-    if not messages:
-        return []
-    
-    # Apply limit if specified
-    if limit and limit > 0:
-        messages = messages[:limit]
-    
     agent = get_agent_for_scenario(scenario)
-    results = []
+    analyzed: Dict[int, Tuple[Message, BaseModel]] = {}
     
-    print(f"\n{Fore.CYAN}Analyzing {len(messages)} messages from {group_name} "
-          f"(scenario: {scenario.name})...{Style.RESET_ALL}")
+    def _on_analysis(i: int, msg: Message, analysis: BaseModel):
+        if on_result:
+            on_result(msg, analysis)
+        else:
+            analyzed[i] = (msg, analysis)
     
-    for i, msg in enumerate(messages, 1):
-        print(f"  [{i}/{len(messages)}] Analyzing message from {msg.sender}...", end="\r")
-        
-        try:
-            analysis = await agent.analyze_message(msg.text)
-            if analysis is None:
-                continue
-            
-            # Create result dict with message context and analysis
-            result = {
-                "message": {
-                    "timestamp": msg.timestamp,
-                    "group_name": group_name,
-                    "sender": msg.sender,
-                    "phone_number": msg.phone_number,
-                    "text": msg.text
-                },
-                "scenario": scenario.name,
-                "analysis": analysis.model_dump()
-            }
-            results.append(result)
-            
-            # Get confidence for colored output
-            confidence = getattr(analysis, scenario.confidence_field, "N/A")
-            confidence_color = {
-                "HIGH": Fore.GREEN,
-                "MEDIUM": Fore.YELLOW,
-                "LOW": Fore.RED
-            }.get(str(confidence), Fore.WHITE)
-            
-            print(f"  [{i}/{len(messages)}] {confidence_color}Analyzed{Style.RESET_ALL} "
-                  f"(confidence: {confidence}) - {msg.sender}")
-        
-        except Exception as e:
-            print(f"  [{i}/{len(messages)}] {Fore.RED}Error:{Style.RESET_ALL} {str(e)}")
+    print(f"\n{Fore.CYAN}Analyzing messages from {group_name} "
+          f"(scenario: {scenario.name}, concurrency: {concurrency})...{Style.RESET_ALL}", file=sys.stderr)
     
-    print(f"  {Fore.GREEN}✓{Style.RESET_ALL} Analysis complete for {group_name}")
-    return results
+    received = await analyze_stream(
+        agent, messages, _on_analysis,
+        concurrency=concurrency, batch_size=batch_size, limit=limit, description=f"  {group_name}"
+    )
+    
+    print(f"  {Fore.GREEN}✓{Style.RESET_ALL} Analysis complete for {group_name} ({received} messages)", file=sys.stderr)
+    return [analyzed[i] for i in sorted(analyzed)]
+
+async def _drain(queue: asyncio.Queue) -> AsyncIterator[Message]:
+    """Yield messages from a queue until the None sentinel arrives."""
+    while (msg := await queue.get()) is not None:
+        yield msg
+    # Leave the sentinel in place so draining again ends immediately
+    queue.put_nowait(None)
 
-async def scan_groups(groups: List[str], scroll_count: int, output_format: str = "json", limit: int = None):
+async def scan_groups(groups: List[str], scroll_count: int, output_format: str = "json", limit: int = None, concurrency: int = 8, batch_size: int = 8):
     """
     Scan groups and output structured insights.
     
     Args:
         groups: List of group names to scan
         scroll_count: Number of times to scroll up in each group
-        output_format: Output format ('json' or 'pretty')
+        output_format: Output format ('json', 'ndjson' or 'pretty')
         limit: Maximum number of messages to analyze per group (None for no limit)
+        concurrency: Maximum number of in-flight model requests per group
+        batch_size: Number of messages sent to the model in a single request
     """
-    print(f"{Fore.YELLOW}Scanning {len(groups)} group(s)...{Style.RESET_ALL}")
-    print(f"Scroll count: {scroll_count}\n")
+    print(f"{Fore.YELLOW}Scanning {len(groups)} group(s)...{Style.RESET_ALL}", file=sys.stderr)
+    print(f"Scroll count: {scroll_count}", file=sys.stderr)
+    print(f"Concurrency: {concurrency}", file=sys.stderr)
+    print(f"Batch size: {batch_size}\n", file=sys.stderr)
     
     scanner = WhatsAppScanner()
-    all_results = []
+    encoded_results: List[bytes] = []  # json output
+    pretty_results: List[Tuple[str, ScenarioDefinition, Message, BaseModel]] = []  # pretty output
+    total_results = 0
+    
+    # ndjson results are written as they arrive instead of being kept until the end
+    stream_results = output_format == "ndjson"
     
     try:
+        # Initialize every agent we will need before the per-message loop
+        scenarios = [config.get_scenario_for_group(group) for group in groups]
+        await warm_agents(scenario for scenario in scenarios if scenario)
+        
         await scanner.start()
         
-        # Scan each group
-        for group in groups:
+        # Messages are analyzed while the group is still being scrolled, and the
+        # next group is scanned in the browser while the previous one finishes
+        groups_queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        
+        async def produce():
             try:
-                scenario = config.get_scenario_for_group(group)
-                if not scenario:
-                    print(f"{Fore.YELLOW}⚠ Warning: No scenario configured for group '{group}', skipping{Style.RESET_ALL}\n")
-                    continue
+                for group in groups:
+                    scenario = config.get_scenario_for_group(group)
+                    if not scenario:
+                        print(f"{Fore.YELLOW}⚠ Warning: No scenario configured for group '{group}', skipping{Style.RESET_ALL}\n", file=sys.stderr)
+                        continue
                     
-                messages = await scanner.scan_group_history(group, scroll_count)
-                results = await analyze_messages(messages, group, scenario, limit)
-                all_results.extend(results)
-            
-            except ValueError as e:
-                # Group not found or couldn't be opened
-                print(f"{Fore.YELLOW}⚠ Skipping group '{group}': {str(e)}{Style.RESET_ALL}\n")
-                continue
-            
-            except Exception as e:
-                # Other errors - log and continue
-                print(f"{Fore.RED}✗ Error processing group '{group}': {str(e)}{Style.RESET_ALL}\n")
-                continue
+                    messages_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, concurrency) * max(1, batch_size))
+                    await groups_queue.put((group, scenario, messages_queue))
+                    try:
+                        async for msg in scanner.scan_group_history_stream(group, scroll_count):
+                            await messages_queue.put(msg)
+                    except ValueError as e:
+                        # Group not found or couldn't be opened
+                        print(f"{Fore.YELLOW}⚠ Skipping group '{group}': {str(e)}{Style.RESET_ALL}\n", file=sys.stderr)
+                    except Exception as e:
+                        # Other errors - log and continue
+                        print(f"{Fore.RED}✗ Error processing group '{group}': {str(e)}{Style.RESET_ALL}\n", file=sys.stderr)
+                    finally:
+                        await messages_queue.put(None)
+            finally:
+                await groups_queue.put(None)
+        
+        async def consume():
+            nonlocal total_results
+            while (item := await groups_queue.get()) is not None:
+                group, scenario, messages_queue = item
+                try:
+                    def _emit(msg: Message, analysis: BaseModel):
+                        nonlocal total_results
+                        total_results += 1
+                        emit_ndjson(group, scenario, msg, analysis)
+                    on_result = _emit if stream_results else None
+                    analyzed = await analyze_messages(_drain(messages_queue), group, scenario, limit, concurrency, batch_size, on_result)
+                    total_results += len(analyzed)
+                    if output_format == "json":
+                        encoded_results.extend(encode_result_indented(group, scenario, msg, analysis) for msg, analysis in analyzed)
+                    elif output_format == "pretty":
+                        pretty_results.extend((group, scenario, msg, analysis) for msg, analysis in analyzed)
+                except Exception as e:
+                    print(f"{Fore.RED}✗ Error processing group '{group}': {str(e)}{Style.RESET_ALL}\n", file=sys.stderr)
+                    # Unblock the producer if analysis stopped before the stream ended
+                    async for _ in _drain(messages_queue):
+                        pass
+        
+        await asyncio.gather(produce(), consume())
         
         # Output results
-        print(f"\n{Fore.CYAN}{'='*80}{Style.RESET_ALL}")
-        print(f"{Fore.GREEN}✓ Scan complete!{Style.RESET_ALL}")
-        print(f"Total insights extracted: {len(all_results)}\n")
+        print(f"\n{Fore.CYAN}{'='*80}{Style.RESET_ALL}", file=sys.stderr)
+        print(f"{Fore.GREEN}✓ Scan complete!{Style.RESET_ALL}", file=sys.stderr)
+        print(f"Total insights extracted: {total_results}\n", file=sys.stderr)
         
         if output_format == "json":
-            print(json.dumps(all_results, indent=2, ensure_ascii=False))
-        else:
+            if encoded_results:
+                _write_stdout_bytes(b"[\n" + b",\n".join(encoded_results) + b"\n]\n")
+            else:
+                _write_stdout_bytes(b"[]\n")
+        elif output_format == "pretty":
             # Pretty print
-            for result in all_results:
+            for group, scenario, msg, analysis in pretty_results:
                 print(f"{Fore.CYAN}{'='*80}{Style.RESET_ALL}")
-                print(f"{Fore.YELLOW}Group:{Style.RESET_ALL} {result['message']['group_name']}")
-                print(f"{Fore.YELLOW}Sender:{Style.RESET_ALL} {result['message']['sender']} ({result['message']['timestamp']})")
-                print(f"{Fore.YELLOW}Scenario:{Style.RESET_ALL} {result['scenario']}")
+                print(f"{Fore.YELLOW}Group:{Style.RESET_ALL} {group}")
+                print(f"{Fore.YELLOW}Sender:{Style.RESET_ALL} {msg.sender} ({msg.timestamp})")
+                print(f"{Fore.YELLOW}Scenario:{Style.RESET_ALL} {scenario.name}")
                 print(f"\n{Fore.YELLOW}Analysis:{Style.RESET_ALL}")
-                for key, value in result['analysis'].items():
+                for key, value in analysis.model_dump().items():
                     print(f"  {key}: {value}")
                 print()
         
     except KeyboardInterrupt:
-        print(f"\n{Fore.YELLOW}Scan interrupted by user.{Style.RESET_ALL}")
+        print(f"\n{Fore.YELLOW}Scan interrupted by user.{Style.RESET_ALL}", file=sys.stderr)
     except Exception as e:
-        print(f"\n{Fore.RED}Error: {str(e)}{Style.RESET_ALL}")
+        print(f"\n{Fore.RED}Error: {str(e)}{Style.RESET_ALL}", file=sys.stderr)
         import traceback
         traceback.print_exc()
     finally:
+        close_agents()
         await scanner.cleanup()
 
 def main():
@@ -173,11 +252,17 @@ Examples:
   Output as pretty-printed text:
     python main.py --scrolls 5 --output pretty
   
+  Stream one JSON object per line as results arrive:
+    python main.py --scrolls 5 --output ndjson
+  
   Scan specific groups:
     python main.py --scrolls 5 --groups "Group 1" "Group 2"
   
   Limit messages per group:
     python main.py --scrolls 10 --scenario third_grade --limit 20
+  
+  Send up to 4 messages to Ollama at once:
+    python main.py --scrolls 5 --concurrency 4
         """
     )
     
@@ -190,9 +275,9 @@ Examples:
     
     parser.add_argument(
         '--output',
-        choices=['json', 'pretty'],
+        choices=['json', 'ndjson', 'pretty'],
         default='json',
-        help='Output format (default: json)'
+        help='Output format; ndjson writes each result as soon as it is ready (default: json)'
     )
     
     parser.add_argument(
@@ -214,21 +299,45 @@ Examples:
         help='Maximum number of messages to analyze per group (default: no limit)'
     )
     
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=8,
+        help='Maximum number of concurrent requests sent to Ollama (default: 8)'
+    )
+    
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=8,
+        help='Number of messages analyzed in a single request, 1 disables batching (default: 8)'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always query the model instead of reusing cached analyses'
+    )
+    
     args = parser.parse_args()
     
+    if args.no_cache:
+        config.use_response_cache = False
+    
     # Print banner
     print_banner()
     
-    print(f"{Fore.YELLOW}Configuration:{Style.RESET_ALL}")
-    print(f"  Ollama URL: {config.ollama_base_url}")
-    print(f"  Model: {config.ollama_model}")
-    print(f"  Scenarios loaded: {len(config.scenario_definitions)}")
-    print()
+    print(f"{Fore.YELLOW}Configuration:{Style.RESET_ALL}", file=sys.stderr)
+    print(f"  Backend: {config.inference_backend} ({config.inference_base_url})", file=sys.stderr)
+    print(f"  Model: {config.ollama_model} (preload keep alive: {config.ollama_preload_keep_alive})", file=sys.stderr)
+    print(f"  Scenarios loaded: {len(config.scenario_definitions)}", file=sys.stderr)
+    print(f"  Response cache: {'enabled' if config.use_response_cache else 'disabled'}", file=sys.stderr)
+    print(file=sys.stderr)
     
     # Load groups
     try:
         if args.groups and args.scenario:
-            print(f"{Fore.RED}Error: Cannot specify both --groups and --scenario{Style.RESET_ALL}")
+            print(f"{Fore.RED}Error: Cannot specify both --groups and --scenario{Style.RESET_ALL}", file=sys.stderr)
             sys.exit(1)
         
         if args.groups:
@@ -236,32 +345,32 @@ Examples:
             # Verify they're configured
             for group in groups:
                 if group not in config.group_to_scenario:
-                    print(f"{Fore.YELLOW}Warning: Group '{group}' not found in configuration{Style.RESET_ALL}")
+                    print(f"{Fore.YELLOW}Warning: Group '{group}' not found in configuration{Style.RESET_ALL}", file=sys.stderr)
         elif args.scenario:
             # Filter groups by scenario
             if args.scenario not in config.scenario_definitions:
-                print(f"{Fore.RED}Error: Scenario '{args.scenario}' not found{Style.RESET_ALL}")
-                print(f"\nAvailable scenarios:")
+                print(f"{Fore.RED}Error: Scenario '{args.scenario}' not found{Style.RESET_ALL}", file=sys.stderr)
+                print(f"\nAvailable scenarios:", file=sys.stderr)
                 for scenario_name in config.scenario_definitions.keys():
-                    print(f"  - {scenario_name}")
+                    print(f"  - {scenario_name}", file=sys.stderr)
                 sys.exit(1)
             
             scenario_def = config.scenario_definitions[args.scenario]
             groups = scenario_def.groups
-            print(f"{Fore.CYAN}Running scenario '{args.scenario}' for {len(groups)} group(s){Style.RESET_ALL}")
+            print(f"{Fore.CYAN}Running scenario '{args.scenario}' for {len(groups)} group(s){Style.RESET_ALL}", file=sys.stderr)
         else:
             groups = config.load_groups()
     except ValueError as e:
-        print(f"{Fore.RED}Configuration Error:{Style.RESET_ALL}")
-        print(f"  {str(e)}")
-        print(f"\nPlease add scenario JSON files to {config.scenarios_dir}")
+        print(f"{Fore.RED}Configuration Error:{Style.RESET_ALL}", file=sys.stderr)
+        print(f"  {str(e)}", file=sys.stderr)
+        print(f"\nPlease add scenario JSON files to {config.scenarios_dir}", file=sys.stderr)
         sys.exit(1)
     
     # Run scan
     try:
-        asyncio.run(scan_groups(groups, args.scrolls, args.output, args.limit))
+        asyncio.run(scan_groups(groups, args.scrolls, args.output, args.limit, args.concurrency, args.batch_size))
     except Exception as e:
-        print(f"\n{Fore.RED}Unexpected error: {str(e)}{Style.RESET_ALL}")
+        print(f"\n{Fore.RED}Unexpected error: {str(e)}{Style.RESET_ALL}", file=sys.stderr)
         import traceback
         traceback.print_exc()
         sys.exit(1)
@@ -1,14 +1,58 @@
 """
-Scenario-aware AI agent wrapper using Ollama.
+Scenario-aware AI agent wrapper using Ollama (or llama.cpp's llama-server).
 """
 import asyncio
-import requests
-from typing import Dict, Optional
+import re
+import sys
+from functools import lru_cache
+from operator import attrgetter
+from typing import Dict, Iterable, List, Optional, Type
 
+import httpx
 from agent_framework.openai import OpenAIChatClient
-from pydantic import BaseModel
+from pydantic import BaseModel, create_model
 
 from src.config import config, ScenarioDefinition
+from src.response_cache import ResponseCache
+
+BATCH_INSTRUCTIONS = (
+    "You will receive several numbered WhatsApp messages in a single request. "
+    "Analyze each message independently and return an 'items' list containing "
+    "exactly one entry per message, in the same order as the messages. Each entry "
+    "gives the message's number (the [n] before it) in 'message_number' and its "
+    "analysis in 'analysis'."
+)
+
+class TriageResult(BaseModel):
+    """Cheap first-pass verdict on whether a message deserves full analysis."""
+    relevant: bool
+
+# The backend probe only needs to succeed once per process, shared by all agents
+_backend_checked = False
+_backend_check_lock = asyncio.Lock()
+
+@lru_cache(maxsize=1)
+def _shared_chat_client() -> OpenAIChatClient:
+    """Return the chat client (and its HTTP connection pool) shared by all agents."""
+    return OpenAIChatClient(
+        model_id=config.ollama_model,
+        api_key="not-needed",
+        base_url=f"{config.inference_base_url}/v1"
+    )
+
+@lru_cache(maxsize=None)
+def _batch_model(response_model: Type[BaseModel]) -> Type[BaseModel]:
+    """Return the wrapper model used to analyze several messages in one request."""
+    # Each analysis echoes its message number, so a reordered or merged answer is detected
+    item_model = create_model(
+        f"{response_model.__name__}BatchItem",
+        message_number=(int, ...),
+        analysis=(response_model, ...)
+    )
+    return create_model(
+        f"{response_model.__name__}Batch",
+        items=(List[item_model], ...)
+    )
 
 class ScenarioAgent:
     """Wraps an Ollama agent for a specific scenario."""
@@ -16,22 +60,52 @@ class ScenarioAgent:
     def __init__(self, scenario: ScenarioDefinition):
         self.scenario = scenario
         self.agent = None
+        self.batch_agent = None
+        self.triage_agent = None
+        self.cache: Optional[ResponseCache] = None
+        if config.use_response_cache:
+            self.cache = ResponseCache(
+                scenario.name,
+                config.ollama_model,
+                scenario.response_model,
+                db_path=config.cache_dir / "responses.sqlite3",
+                prompt=scenario.prompt
+            )
+        self._gate = self._compile_prefilter(scenario)
+        self._confidence_getter = attrgetter(scenario.confidence_field) if scenario.confidence_field else None
         self._initialized = False
     
+    @staticmethod
+    def _compile_prefilter(scenario: ScenarioDefinition) -> Optional[re.Pattern]:
+        """Compile the scenario's keyword/regex prefilter into a single pattern."""
+        patterns = [re.escape(keyword) for keyword in scenario.prefilter_keywords]
+        if scenario.prefilter_regex:
+            patterns.append(scenario.prefilter_regex)
+        if not patterns:
+            return None
+        return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+    
+    def get_confidence(self, analysis: BaseModel) -> str:
+        """Return the analysis' confidence value, or "N/A" if the scenario has none."""
+        if self._confidence_getter is None:
+            return "N/A"
+        try:
+            return self._confidence_getter(analysis)
+        except AttributeError:
+            return "N/A"
+    
+    def passes_prefilter(self, message: str) -> bool:
+        """Return True if the message is worth sending to the model."""
+        return self._gate is None or self._gate.search(message) is not None
+    
     async def initialize(self):
         """Initialize the agent asynchronously."""
         if self._initialized:
             return
         
-        self._check_ollama_connection()
-        
-        openai_compatible_url = f"{config.ollama_base_url}/v1"
+        await self._check_backend_connection()
         
-        chat_client = OpenAIChatClient(
-            model_id=config.ollama_model,
-            api_key="not-needed",
-            base_url=openai_compatible_url
-        )
+        chat_client = _shared_chat_client()
         
         # Use the dynamically created Pydantic model from scenario definition
         self.agent = chat_client.create_agent(
@@ -40,23 +114,77 @@ class ScenarioAgent:
             response_format=self.scenario.response_model
         )
         
+        # Wrapper model so several messages can be analyzed in one request
+        self.batch_agent = chat_client.create_agent(
+            name=f"{self.scenario.name.capitalize()}BatchAnalyzer",
+            instructions=f"{self.scenario.prompt}\n\n{BATCH_INSTRUCTIONS}",
+            response_format=_batch_model(self.scenario.response_model)
+        )
+        
+        # Optional first pass that only answers whether the message is relevant
+        if self.scenario.triage_prompt:
+            self.triage_agent = chat_client.create_agent(
+                name=f"{self.scenario.name.capitalize()}Triage",
+                instructions=self.scenario.triage_prompt,
+                response_format=TriageResult
+            )
+        
         self._initialized = True
     
-    def _check_ollama_connection(self):
-        """Verify that Ollama is reachable."""
-        try:
-            response = requests.get(f"{config.ollama_base_url}/api/tags", timeout=5)
+    async def _check_backend_connection(self):
+        """Verify that the inference backend is reachable (probed once per process)."""
+        global _backend_checked
+        if _backend_checked:
+            return
+        
+        async with _backend_check_lock:
+            if _backend_checked:
+                return
+            
+            base_url = config.inference_base_url
+            if config.inference_backend == "llama-cpp":
+                backend_name, probe_path, start_hint = "llama-server", "/health", "llama-server -m <model>.gguf"
+            else:
+                backend_name, probe_path, start_hint = "Ollama", "/api/tags", "ollama serve"
+            
+            try:
+                async with httpx.AsyncClient(timeout=5) as client:
+                    response = await client.get(f"{base_url}{probe_path}")
+            except httpx.HTTPError as e:
+                raise ConnectionError(
+                    f"Could not connect to {backend_name} at {base_url}\n"
+                    f"Make sure {backend_name} is running: {start_hint}\n"
+                    f"Error: {str(e)}"
+                )
+            
             if response.status_code != 200:
                 raise ConnectionError(
-                    f"Ollama responded with status {response.status_code}\n"
-                    f"Make sure Ollama is running: ollama serve"
+                    f"{backend_name} responded with status {response.status_code}\n"
+                    f"Make sure {backend_name} is running: {start_hint}"
                 )
-        except requests.exceptions.RequestException as e:
-            raise ConnectionError(
-                f"Could not connect to Ollama at {config.ollama_base_url}\n"
-                f"Make sure Ollama is running: ollama serve\n"
-                f"Error: {str(e)}"
-            )
+            
+            _backend_checked = True
+            if config.inference_backend == "ollama":
+                await self._preload_model()
+    
+    async def _preload_model(self):
+        """
+        Load the model before the first request.
+        
+        The OpenAI-compatible endpoint has no keep_alive option, so the model is
+        loaded through Ollama's native API. This only covers the wait until the first
+        chat request: each of those resets the expiry to the server's OLLAMA_KEEP_ALIVE.
+        """
+        try:
+            async with httpx.AsyncClient(timeout=120) as client:
+                response = await client.post(
+                    f"{config.ollama_base_url}/api/generate",
+                    json={"model": config.ollama_model, "keep_alive": config.ollama_preload_keep_alive}
+                )
+            if response.status_code != 200:
+                print(f"Warning: could not preload {config.ollama_model} (status {response.status_code})", file=sys.stderr)
+        except httpx.HTTPError as e:
+            print(f"Warning: could not preload {config.ollama_model}: {str(e)}", file=sys.stderr)
     
     async def analyze_message(self, message: str) -> Optional[BaseModel]:
         """
@@ -68,15 +196,110 @@ class ScenarioAgent:
         Returns:
             Structured analysis Pydantic model or None
         """
+        if not self.passes_prefilter(message):
+            return None
+        
+        if self.cache:
+            cached = self.cache.get(message)
+            if cached is not None:
+                return cached
+        
         if not self._initialized:
             await self.initialize()
         
+        if not await self._is_relevant(message):
+            return None
+        
+        return await self._analyze_uncached(message)
+    
+    async def _is_relevant(self, message: str) -> bool:
+        """Run the scenario's triage pass, if any; errors count as relevant."""
+        if self.triage_agent is None:
+            return True
+        
+        try:
+            result = await self.triage_agent.run(message)
+            return result.value is None or result.value.relevant
+        except Exception as e:
+            print(f"Error triaging message ({self.scenario.name}): {str(e)}", file=sys.stderr)
+            return True
+    
+    async def _analyze_uncached(self, message: str) -> Optional[BaseModel]:
+        """Run the full structured analysis for a message and cache the result."""
         try:
             result = await self.agent.run(message)
+            if self.cache and result.value is not None:
+                self.cache.put(message, result.value)
             return result.value
         except Exception as e:
-            print(f"Error analyzing message ({self.scenario.name}): {str(e)}")
+            print(f"Error analyzing message ({self.scenario.name}): {str(e)}", file=sys.stderr)
             return None
+    
+    async def analyze_batch(self, messages: List[str]) -> List[Optional[BaseModel]]:
+        """
+        Analyze several messages with a single request to the scenario's agent.
+        
+        Falls back to one request per message (sent concurrently) if the model does not
+        return exactly one result for each message number.
+        
+        Args:
+            messages: WhatsApp message texts
+        
+        Returns:
+            One structured analysis (or None) per message, in the same order
+        """
+        results: List[Optional[BaseModel]] = [None] * len(messages)
+        pending = [i for i, message in enumerate(messages) if self.passes_prefilter(message)]
+        if self.cache:
+            for i in pending:
+                results[i] = self.cache.get(messages[i])
+            pending = [i for i in pending if results[i] is None]
+        
+        if not pending:
+            return results
+        
+        if not self._initialized:
+            await self.initialize()
+        
+        # Triage the whole batch concurrently rather than one round-trip at a time
+        relevant = await asyncio.gather(*(self._is_relevant(messages[i]) for i in pending))
+        pending = [i for i, is_relevant in zip(pending, relevant) if is_relevant]
+        if len(pending) <= 1:
+            return await self._analyze_each(messages, pending, results)
+        
+        prompt = "Analyze each message below and return one result per message in order.\n\n"
+        prompt += "\n\n".join(f"[{n}] {messages[i]}" for n, i in enumerate(pending, 1))
+        
+        try:
+            result = await self.batch_agent.run(prompt)
+            analyses = {item.message_number: item.analysis for item in result.value.items}
+            # Every message number exactly once; anything else could pair an analysis with the wrong message
+            if len(result.value.items) == len(pending) and analyses.keys() == set(range(1, len(pending) + 1)):
+                for n, i in enumerate(pending, 1):
+                    results[i] = analyses[n]
+                    if self.cache:
+                        self.cache.put(messages[i], analyses[n])
+                return results
+            print(f"Batch result misaligned ({self.scenario.name}): expected message numbers 1-{len(pending)}, "
+                  f"got {[item.message_number for item in result.value.items]}; falling back to per-message analysis",
+                  file=sys.stderr)
+        except Exception as e:
+            print(f"Error analyzing batch ({self.scenario.name}): {str(e)}", file=sys.stderr)
+        
+        return await self._analyze_each(messages, pending, results)
+    
+    async def _analyze_each(self, messages: List[str], indices: List[int],
+                            results: List[Optional[BaseModel]]) -> List[Optional[BaseModel]]:
+        """Analyze the messages at the given indices concurrently, one request each, into results."""
+        analyses = await asyncio.gather(*(self._analyze_uncached(messages[i]) for i in indices))
+        for i, analysis in zip(indices, analyses):
+            results[i] = analysis
+        return results
+    
+    def close(self):
+        """Persist and close the agent's response cache."""
+        if self.cache:
+            self.cache.close()
 
 _agent_cache: Dict[str, ScenarioAgent] = {}
 
@@ -86,3 +309,15 @@ def get_agent_for_scenario(scenario: ScenarioDefinition) -> ScenarioAgent:
     if key not in _agent_cache:
         _agent_cache[key] = ScenarioAgent(scenario)
     return _agent_cache[key]
+
+async def warm_agents(scenarios: Iterable[ScenarioDefinition]) -> List[ScenarioAgent]:
+    """Initialize the agents for the given scenarios concurrently."""
+    unique_scenarios = {scenario.name: scenario for scenario in scenarios}
+    agents = [get_agent_for_scenario(scenario) for scenario in unique_scenarios.values()]
+    await asyncio.gather(*(agent.initialize() for agent in agents))
+    return agents
+
+def close_agents():
+    """Close every cached scenario agent, committing their cached analyses."""
+    for agent in _agent_cache.values():
+        agent.close()
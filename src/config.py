@@ -3,12 +3,15 @@ Configuration management for WhatsApp Padel Match Tracker and scenario definitio
 """
 import os
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Type
+from types import MappingProxyType
+from typing import Dict, List, Literal, Mapping, Optional, Any, Tuple, Type
 
+import orjson
 from dotenv import load_dotenv
-from pydantic import BaseModel, create_model
+from pydantic import BaseModel, ConfigDict, create_model
 from pydantic.fields import FieldInfo
 
 from test_apps.padel import UserPreferences
@@ -25,6 +28,66 @@ class ScenarioDefinition:
     groups: List[str]
     confidence_field: Optional[str] = "confidence"
     reasoning_field: Optional[str] = "reasoning"
+    prefilter_keywords: List[str] = field(default_factory=list)  # Skip messages containing none of these
+    prefilter_regex: Optional[str] = None  # Skip messages not matching this pattern
+    triage_prompt: Optional[str] = None  # Cheap relevance check run before the full analysis
+
+@lru_cache(maxsize=None)
+def _make_literal(values: tuple) -> Type:
+    """Return the Literal type for a tuple of enum values, shared across scenarios."""
+    return Literal[values]
+
+def _json_type_to_python(field_schema: Dict[str, Any]) -> Type:
+    """Convert JSON schema type to Python type."""
+    json_type = field_schema.get("type")
+    
+    if json_type == "string":
+        # Check for enum (Literal type)
+        if "enum" in field_schema:
+            return _make_literal(tuple(field_schema["enum"]))
+        return str
+    elif json_type == "boolean":
+        return bool
+    elif json_type == "integer":
+        return int
+    elif json_type == "number":
+        return float
+    elif json_type == "array":
+        return list
+    elif json_type == "object":
+        return dict
+    else:
+        return str  # Default fallback
+
+def _field_definition(field_name: str, field_schema: Dict[str, Any], required_fields: frozenset) -> Tuple[Type, Any]:
+    """Build the (type, FieldInfo) pair for one schema property."""
+    field_type = _json_type_to_python(field_schema)
+    default_value = field_schema.get("default", ...)
+    description = field_schema.get("description", "")
+    
+    # If field is not required and has no default, use None as default
+    if field_name not in required_fields and default_value == ...:
+        default_value = None
+        field_type = Optional[field_type]
+    
+    # Without a description the bare default is enough; pydantic builds the FieldInfo itself
+    if not description:
+        return field_type, default_value
+    return field_type, FieldInfo(default=default_value, description=description)
+
+@lru_cache(maxsize=None)
+def _build_model(name: str, schema_key: str) -> Type[BaseModel]:
+    """Build (once per name and schema) the Pydantic model for a JSON schema."""
+    schema = json.loads(schema_key)
+    required_fields = frozenset(schema.get("required", []))
+    
+    field_definitions = {
+        field_name: _field_definition(field_name, field_schema, required_fields)
+        for field_name, field_schema in schema.get("properties", {}).items()
+    }
+    
+    # Build the core schema on first validation rather than at load time
+    return create_model(name, __config__=ConfigDict(defer_build=True), **field_definitions)
 
 class Config:
     """Configuration loader and manager."""
@@ -33,12 +96,26 @@ class Config:
         self.base_dir = Path(__file__).parent.parent
         self.scenarios_dir = self.base_dir / "scenarios"
         self.session_dir = self.base_dir / "whatsapp_session"
-        self.scenario_definitions: Dict[str, ScenarioDefinition] = {}
-        self.group_to_scenario: Dict[str, ScenarioDefinition] = {}
+        self.cache_dir = self.base_dir / ".cache"
 
         # Ollama configuration
         self.ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         self.ollama_model = os.getenv("OLLAMA_MODEL", "gpt-oss:20b")
+        # How long the startup preload keeps the model loaded. Chat requests go through the
+        # OpenAI-compatible API, which has no keep_alive, so after each one the server's own
+        # OLLAMA_KEEP_ALIVE (set on `ollama serve`) decides when the model is unloaded.
+        self.ollama_preload_keep_alive = os.getenv("OLLAMA_PRELOAD_KEEP_ALIVE", "30m")
+
+        # Inference backend: "ollama" or "llama-cpp" (llama.cpp's llama-server)
+        self.inference_backend = os.getenv("INFERENCE_BACKEND", "ollama")
+        self.llama_cpp_base_url = os.getenv("LLAMA_CPP_BASE_URL", "http://localhost:8080")
+        if self.inference_backend not in ("ollama", "llama-cpp"):
+            raise ValueError(
+                f"Unknown INFERENCE_BACKEND '{self.inference_backend}' (expected 'ollama' or 'llama-cpp')"
+            )
+
+        # Response cache (disable with --no-cache)
+        self.use_response_cache = True
 
         # User preferences
         self.user_preferences = UserPreferences()
@@ -47,20 +124,50 @@ class Config:
         self.default_scroll_count = 5
         self.default_monitor_interval = 60  # seconds
 
-        # Load scenarios to know available groups
-        self._load_scenarios()
-
-    def _load_scenarios(self):
+    @property
+    def inference_base_url(self) -> str:
+        """Base URL of the configured inference backend."""
+        if self.inference_backend == "llama-cpp":
+            return self.llama_cpp_base_url
+        return self.ollama_base_url
+
+    @cached_property
+    def scenario_definitions(self) -> Dict[str, ScenarioDefinition]:
+        """Scenario definitions by name, loaded on first access."""
+        return self._load_scenarios()
+
+    @cached_property
+    def group_to_scenario(self) -> Mapping[str, ScenarioDefinition]:
+        """Scenario definition for each monitored group (read-only)."""
+        return MappingProxyType({
+            group: scenario
+            for scenario in self.scenario_definitions.values()
+            for group in scenario.groups
+        })
+
+    @cached_property
+    def _groups(self) -> Tuple[str, ...]:
+        """All monitored group names, in load order."""
+        return tuple(self.group_to_scenario)
+
+    def _load_scenarios(self) -> Dict[str, ScenarioDefinition]:
         """Load scenario definitions from individual JSON files and create Pydantic models dynamically."""
+        scenario_definitions: Dict[str, ScenarioDefinition] = {}
         if not self.scenarios_dir.exists():
-            return
+            return scenario_definitions
 
         # Load all .json files from scenarios directory
-        for scenario_file in self.scenarios_dir.glob("*.json"):
-            name = scenario_file.stem  # Filename without .json extension
+        with os.scandir(self.scenarios_dir) as entries:
+            scenario_files = [
+                entry for entry in entries
+                if entry.name.endswith(".json") and entry.is_file()
+            ]
+
+        for scenario_file in scenario_files:
+            name = scenario_file.name[:-len(".json")]  # Filename without .json extension
             
-            with open(scenario_file, "r", encoding="utf-8") as f:
-                details = json.load(f)
+            with open(scenario_file.path, "rb") as f:
+                details = orjson.loads(f.read())
             prompt = (details.get("prompt") or "").strip()
             response_schema = details.get("response_schema")
             groups = details.get("groups") or []
@@ -82,64 +189,24 @@ class Config:
                 groups=groups,
                 confidence_field=confidence_field,
                 reasoning_field=reasoning_field,
+                prefilter_keywords=details.get("prefilter_keywords") or [],
+                prefilter_regex=details.get("prefilter_regex"),
+                triage_prompt=(details.get("triage_prompt") or "").strip() or None,
             )
-            self.scenario_definitions[name] = scenario
-            for group in groups:
-                self.group_to_scenario[group] = scenario
+            scenario_definitions[name] = scenario
+
+        return scenario_definitions
 
     def _create_pydantic_model_from_schema(self, name: str, schema: Dict[str, Any]) -> Type[BaseModel]:
         """Create a Pydantic model dynamically from a JSON schema."""
-        properties = schema.get("properties", {})
-        required_fields = set(schema.get("required", []))
-        
-        field_definitions = {}
-        for field_name, field_schema in properties.items():
-            field_type = self._json_type_to_python(field_schema)
-            default_value = field_schema.get("default", ...)
-            description = field_schema.get("description", "")
-            
-            # If field is not required and has no default, use None as default
-            if field_name not in required_fields and default_value == ...:
-                default_value = None
-                # Make the type Optional
-                from typing import Union
-                field_type = Union[field_type, type(None)]
-            
-            field_definitions[field_name] = (
-                field_type,
-                FieldInfo(default=default_value, description=description)
-            )
-        
-        return create_model(name, **field_definitions)
-    
-    def _json_type_to_python(self, field_schema: Dict[str, Any]) -> Type:
-        """Convert JSON schema type to Python type."""
-        from typing import Literal
-        
-        json_type = field_schema.get("type")
-        
-        if json_type == "string":
-            # Check for enum (Literal type)
-            if "enum" in field_schema:
-                enum_values = tuple(field_schema["enum"])
-                return Literal[enum_values]
-            return str
-        elif json_type == "boolean":
-            return bool
-        elif json_type == "integer":
-            return int
-        elif json_type == "number":
-            return float
-        elif json_type == "array":
-            return list
-        elif json_type == "object":
-            return dict
-        else:
-            return str  # Default fallback
-
-    def load_groups(self) -> List[str]:
-        """Return the list of WhatsApp groups defined in scenarios."""
-        groups = list(self.group_to_scenario.keys())
+        # Identical schemas share one model class (and its validator/serializer).
+        # Keys keep their order, since field order shapes the schema sent to the model.
+        schema_key = json.dumps(schema)
+        return _build_model(name, schema_key)
+
+    def load_groups(self) -> Tuple[str, ...]:
+        """Return the WhatsApp groups defined in scenarios."""
+        groups = self._groups
         if not groups:
             raise ValueError(
                 f"No groups defined in {self.scenarios_dir}. Please add at least one scenario JSON file with a 'groups' list."
@@ -150,14 +217,19 @@ class Config:
         """Get the scenario definition for a given group."""
         return self.group_to_scenario.get(group_name)
 
-    def get_all_scenarios(self) -> List[ScenarioDefinition]:
-        """Return all loaded scenario definitions."""
+    @cached_property
+    def _all_scenarios(self) -> List[ScenarioDefinition]:
+        """All scenario definitions in load order; the first one is the default."""
         return list(self.scenario_definitions.values())
+
+    def get_all_scenarios(self) -> List[ScenarioDefinition]:
+        """Return all loaded scenario definitions (a shared list; do not modify)."""
+        return self._all_scenarios
     
     def get_default_scenario(self) -> ScenarioDefinition:
         """Return a fallback scenario if a group is not mapped."""
-        if self.scenario_definitions:
-            return next(iter(self.scenario_definitions.values()))
+        if self._all_scenarios:
+            return self._all_scenarios[0]
         raise RuntimeError("No scenario definitions are available")
 
 # Global config instance
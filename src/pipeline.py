@@ -0,0 +1,119 @@
+"""
+Streaming analysis pipeline shared by the entry points.
+"""
+import sys
+import asyncio
+from typing import AsyncIterable, Callable, Dict, List, Optional, Tuple
+
+from colorama import Fore, Style
+from pydantic import BaseModel
+from tqdm import tqdm
+
+from src.agent import ScenarioAgent
+from src.whatsapp_scanner import Message
+
+# Number of recently completed texts whose analysis is kept for later duplicates
+DEDUP_WINDOW = 1024
+
+async def analyze_stream(
+    agent: ScenarioAgent,
+    messages: AsyncIterable[Message],
+    on_analysis: Callable[[int, Message, BaseModel], None],
+    concurrency: int = 8,
+    batch_size: int = 8,
+    limit: Optional[int] = None,
+    description: str = "",
+) -> int:
+    """
+    Analyze messages as they arrive, calling on_analysis for each one that gets a result.
+
+    Each distinct text is sent to the model once, in batches of batch_size, and its
+    analysis is fanned back out to every message with that text (and to repeats that
+    arrive later, while the text is among the last DEDUP_WINDOW completed). Reading from the
+    stream pauses whenever all concurrency slots are busy, so in-flight work stays
+    bounded.
+
+    Args:
+        agent: ScenarioAgent to analyze with
+        messages: Async stream of messages to analyze
+        on_analysis: Callback receiving (arrival index, message, analysis)
+        concurrency: Maximum number of in-flight requests to the model
+        batch_size: Number of messages sent to the model in a single request
+        limit: Maximum number of messages to analyze (None for no limit)
+        description: Label for the progress bar
+
+    Returns:
+        Number of messages analyzed
+    """
+    batch_size = max(1, batch_size)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    received = 0
+    tasks = set()  # In-flight batches only; finished ones drop out
+
+    # Send each distinct in-flight text to the model once and fan the analysis back out
+    occurrences: Dict[str, List[Tuple[int, Message]]] = {}
+    completed: Dict[str, Optional[BaseModel]] = {}
+
+    # Progress goes to stderr so stdout stays free for structured output
+    progress = tqdm(total=0, desc=description, unit="msg", file=sys.stderr, leave=False)
+
+    def _record(analysis: Optional[BaseModel], occurrence: List[Tuple[int, Message]]):
+        progress.update(len(occurrence))
+        if analysis is None:
+            return
+
+        for i, msg in occurrence:
+            on_analysis(i, msg, analysis)
+
+        progress.set_postfix(sender=msg.sender, confidence=agent.get_confidence(analysis))
+
+    async def _analyze(batch: List[str]):
+        try:
+            analyses = await agent.analyze_batch(batch)
+        except Exception as e:
+            tqdm.write(f"  {Fore.RED}Error:{Style.RESET_ALL} {str(e)}", file=sys.stderr)
+            analyses = [None] * len(batch)
+        finally:
+            semaphore.release()
+
+        for text, analysis in zip(batch, analyses):
+            _record(analysis, occurrences.pop(text))
+            # Keep only a window of recent analyses so memory doesn't grow with the stream
+            completed[text] = analysis
+            if len(completed) > DEDUP_WINDOW:
+                del completed[next(iter(completed))]
+
+    async def _dispatch(batch: List[str]):
+        # Wait for a free slot before reading further
+        await semaphore.acquire()
+        task = asyncio.create_task(_analyze(batch))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    batch: List[str] = []
+    async for msg in messages:
+        # Keep draining the stream past the limit so the producer is never blocked
+        if limit and limit > 0 and received >= limit:
+            continue
+
+        i = received
+        received += 1
+        progress.total = received  # Shown on the next (rate-limited) update
+
+        if msg.text in completed:
+            _record(completed[msg.text], [(i, msg)])
+        elif msg.text in occurrences:
+            occurrences[msg.text].append((i, msg))
+        else:
+            occurrences[msg.text] = [(i, msg)]
+            batch.append(msg.text)
+            if len(batch) >= batch_size:
+                await _dispatch(batch)
+                batch = []
+
+    if batch:
+        await _dispatch(batch)
+    await asyncio.gather(*tasks)
+
+    progress.close()
+    return received
@@ -0,0 +1,101 @@
+"""
+Response cache for scenario analyses, backed by an in-memory dict and SQLite.
+"""
+import json
+import hashlib
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Type
+
+from pydantic import BaseModel
+
+# Writes are committed in batches rather than one fsync per analysis; close() commits the rest
+COMMIT_EVERY = 32
+# Recently used analyses kept in memory; older ones are re-read from SQLite when needed
+MEMORY_MAX_SIZE = 1024
+
+class ResponseCache:
+    """Caches structured analyses keyed by (scenario, model, prompt and schema, normalized message text)."""
+    
+    def __init__(self, scenario_name: str, model_name: str, response_model: Type[BaseModel], db_path: Optional[Path] = None,
+                 prompt: str = ""):
+        self.scenario_name = scenario_name
+        self.model_name = model_name
+        self.response_model = response_model
+        # Editing the scenario's prompt or response fields changes every key, so stale
+        # analyses from the old definition are never served
+        schema = json.dumps(response_model.model_json_schema(), sort_keys=True)
+        self._definition_digest = hashlib.sha1(f"{prompt}\x1f{schema}".encode("utf-8")).hexdigest()[:16]
+        self._memory: "OrderedDict[str, BaseModel]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._uncommitted = 0
+        
+        if db_path is not None:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path))
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            self._db.commit()
+    
+    def _key(self, message: str) -> str:
+        """Build the cache key for a message."""
+        digest = hashlib.sha1(message.strip().lower().encode("utf-8")).hexdigest()
+        return f"{self.scenario_name}:{self.model_name}:{self._definition_digest}:{digest}"
+    
+    def get(self, message: str) -> Optional[BaseModel]:
+        """Return the cached analysis for a message, or None on a miss."""
+        key = self._key(message)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        
+        if self._db is None:
+            return None
+        
+        row = self._db.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        
+        try:
+            analysis = self.response_model.model_validate_json(row[0])
+        except ValueError:
+            # Stored response no longer matches the scenario schema
+            return None
+        self._remember(key, analysis)
+        return analysis
+    
+    def put(self, message: str, analysis: BaseModel):
+        """Store the analysis for a message."""
+        key = self._key(message)
+        self._remember(key, analysis)
+        
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value) VALUES (?, ?)",
+                (key, analysis.model_dump_json())
+            )
+            self._uncommitted += 1
+            if self._uncommitted >= COMMIT_EVERY:
+                self.flush()
+    
+    def _remember(self, key: str, analysis: BaseModel):
+        """Keep an analysis in memory, evicting the least recently used one when full."""
+        self._memory[key] = analysis
+        self._memory.move_to_end(key)
+        if len(self._memory) > MEMORY_MAX_SIZE:
+            self._memory.popitem(last=False)
+    
+    def flush(self):
+        """Commit any pending writes to the database."""
+        if self._db is not None and self._uncommitted:
+            self._db.commit()
+            self._uncommitted = 0
+    
+    def close(self):
+        """Commit pending writes and close the underlying database connection."""
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
@@ -2,26 +2,229 @@
 WhatsApp scanner for multiple groups with message extraction.
 """
 import re
+import sys
 import time
 import asyncio
+import hashlib
+import platform
+from dataclasses import dataclass
 from enum import Enum
-from typing import List, Dict, Set, Optional
+from functools import lru_cache
+from collections.abc import MutableSet
+from typing import AsyncIterator, Iterable, Iterator, List, Dict, Optional
 from datetime import datetime
 from playwright.async_api import async_playwright, Page, TimeoutError as PlaywrightTimeoutError
 from src.config import config
 
+# Collects the raw fields of every message in the open chat with a single round-trip.
+# Parsing (sender, timestamp, phone) stays in Python; only DOM reads happen here.
+# Own (outgoing) messages and messages whose WhatsApp data-id is in skipIds are only
+# counted. The chat is walked newest first; when it reaches the message with data-id
+# stopAtId the walk ends, since everything above it was read by an earlier call.
+EXTRACT_MESSAGES_JS = """
+({skipIds, stopAtId}) => {
+    const skip = new Set(skipIds || []);
+    let selector = '[data-testid="msg-container"]';
+    let elements = document.querySelectorAll(selector);
+    if (elements.length === 0) {
+        selector = 'div[data-id]';
+        elements = document.querySelectorAll(selector);
+    }
+
+    const textOf = (node) => (node ? (node.innerText || '').trim() : '');
+    const isOwn = (el) => (el.getAttribute('class') || '').includes('message-out')
+        || el.querySelector('[data-icon="msg-check"], [data-icon="msg-dblcheck"]') !== null;
+
+    const read = (el, dataId) => {
+        try {
+            // The sender fallbacks are only read when data-pre-plain-text has no name
+            const prePlain = el.querySelector('[data-pre-plain-text]');
+            const prePlainText = prePlain ? prePlain.getAttribute('data-pre-plain-text') || '' : '';
+            const preSender = ((/^[^"]*\]\s*([^:]+):/.exec(prePlainText) || [])[1] || '').trim();
+            const namedByPreText = preSender !== '' && !/^[\d\s\-+()]+$/.test(preSender);
+            const ariaSender = namedByPreText ? '' : textOf(el.querySelector('span[aria-label^="Maybe "]'));
+            const senderSpans = namedByPreText || ariaSender ? [] : Array.from(el.querySelectorAll('span[dir="auto"]'))
+                .filter((span) => !(span.getAttribute('class') || '').includes('_ahx_')
+                    && span.getAttribute('role') !== 'button')
+                .map(textOf);
+
+            return {
+                dataId: dataId,
+                ariaSender: ariaSender,
+                prePlainText: prePlainText,
+                senderSpans: senderSpans,
+                text: textOf(el.querySelector('span.selectable-text')),
+                fullText: textOf(el),
+                phoneButton: textOf(el.querySelector('span._ahx_[role="button"]')),
+            };
+        } catch (e) {
+            return null;
+        }
+    };
+
+    const records = [];
+    let ownCount = 0;
+    let newestId = null;
+    for (let i = elements.length - 1; i >= 0; i--) {
+        const el = elements[i];
+        const holder = el.closest('[data-id]');
+        const dataId = holder ? holder.getAttribute('data-id') : null;
+        if (dataId !== null) {
+            if (stopAtId && dataId === stopAtId) {
+                break;
+            }
+            if (newestId === null) {
+                newestId = dataId;
+            }
+            if (skip.has(dataId)) {
+                continue;
+            }
+        }
+        if (isOwn(el)) {
+            ownCount++;
+            continue;
+        }
+        records.push(read(el, dataId));
+    }
+    records.reverse();
+
+    return {
+        selector: selector, records: records, ownCount: ownCount, total: elements.length,
+        newestId: newestId === null ? stopAtId || null : newestId,
+    };
+}
+"""
+
+# WhatsApp data-id of the newest message rendered in the open chat, without reading any content
+NEWEST_DATA_ID_JS = """
+() => {
+    const elements = document.querySelectorAll('div[data-id]');
+    const count = elements.length;
+    return { count: count, newestId: count ? elements[count - 1].getAttribute('data-id') : null };
+}
+"""
+
+_RE_PRE_TEXT_SENDER = re.compile(r'[^"]*\]\s*([^:]+):')  # "[time, date] Sender: "
+_RE_PRE_TEXT_DATE = re.compile(r'\[[^,\]]*,\s*([^\]]+)\]')  # "[time, date] ..."
+_RE_TIME = re.compile(r'\[?(\d{1,2}:\d{2})\]?')
+_RE_TS_PREFIX = re.compile(r'^\d{1,2}:\d{2}')
+_RE_DIGITS_ONLY = re.compile(r'^[\d\s\-+()]+$')
+_RE_PHONES = [
+    re.compile(r'\+972[-\s]?\d{1,2}[-\s]?\d{3}[-\s]?\d{4}'),  # +972-XX-XXX-XXXX
+    re.compile(r'0\d{1,2}[-\s]?\d{3}[-\s]?\d{4}'),  # 0XX-XXX-XXXX
+    re.compile(r'\d{10}'),  # 10 digits together
+]
+# Any of the above in one scan, so text without a phone number is rejected in a single pass
+_RE_ANY_PHONE = re.compile('|'.join(pattern.pattern for pattern in _RE_PHONES))
+# Spaces and dashes dropped from phone numbers, in one pass
+_PHONE_SEPARATORS = str.maketrans('', '', ' -')
+
+# Scrolls passes in a row that may load nothing before the chat counts as fully loaded
+NO_GROWTH_LIMIT = 2
+
+# Scrolls the open chat to its top up to `count` times, each time waiting (up to 2s) for
+# older messages to render. Stops early after `noGrowthLimit` passes in a row load nothing
+# (the start of the chat). Returns how many passes loaded something, or null if the chat's
+# scroll container cannot be found.
+SCROLL_HISTORY_JS = """
+async ({ count, noGrowthLimit }) => {
+    const first = document.querySelector('#main div[data-id]');
+    let pane = first ? first.parentElement : null;
+    while (pane && !(pane.scrollHeight > pane.clientHeight
+            && /(auto|scroll)/.test(getComputedStyle(pane).overflowY))) {
+        pane = pane.parentElement;
+    }
+    if (!pane) {
+        return null;
+    }
+
+    const total = () => pane.querySelectorAll('[data-id]').length;
+    let loaded = 0;
+    let misses = 0;
+    for (let i = 0; i < count && misses < noGrowthLimit; i++) {
+        const before = total();
+        pane.scrollTop = 0;
+        for (let waited = 0; waited < 2000 && total() === before; waited += 100) {
+            await new Promise((resolve) => setTimeout(resolve, 100));
+        }
+        if (total() === before) {
+            misses += 1;
+        } else {
+            loaded += 1;
+            misses = 0;
+        }
+    }
+    return loaded;
+}
+"""
+
+# Select-all shortcut: Command on macOS, Control on other platforms
+_SELECT_ALL_KEY = "Meta+a" if platform.system() == "Darwin" else "Control+a"
+
+# True once a text field (the chat search box) has keyboard focus
+SEARCH_FOCUSED_JS = """
+() => document.activeElement !== null
+    && (document.activeElement.isContentEditable || document.activeElement.tagName === 'INPUT')
+"""
+
+# True once the search results contain the group (passed as the argument) or say nothing matched
+SEARCH_SETTLED_JS = """
+(name) => Array.from(document.querySelectorAll('span[title]')).some((span) => span.title === name)
+    || /No chats, contacts or messages found/i.test(document.body.innerText)
+"""
+
+@lru_cache(maxsize=4096)
+def _message_id(group_name: str, sender: str, text: str, date: str, timestamp: str) -> str:
+    """Stable (across runs) ID for a message's group, sender, full text, date and time."""
+    key = "\x1f".join((group_name, sender, text, date, timestamp)).encode("utf-8")
+    return hashlib.blake2b(key, digest_size=16).hexdigest()
+
 class ScanMode(Enum):
     """Scanning mode for WhatsApp groups."""
     HISTORY = "history"
     LIVE = "live"
 
+@dataclass(slots=True, frozen=True)
 class Message:
     """Simple message data structure."""
-    def __init__(self, sender: str, text: str, timestamp: str, phone_number: str = "N/A"):
-        self.sender = sender
-        self.text = text
-        self.timestamp = timestamp
-        self.phone_number = phone_number
+    sender: str
+    text: str
+    timestamp: str
+    phone_number: str = "N/A"
+    group_name: str = ""
+    date: str = ""  # As WhatsApp shows it (e.g. "15/10/2026"); empty if unknown
+
+# Enough to recognize everything a live check can still see, without growing forever
+MAX_SEEN_MESSAGE_IDS = 5000
+
+class RecentIds(MutableSet):
+    """Insertion-ordered set of IDs that forgets the oldest ones beyond max_size."""
+    
+    def __init__(self, max_size: int, ids: Iterable[str] = ()):
+        self.max_size = max_size
+        self._ids: Dict[str, None] = {}
+        for msg_id in ids:
+            self.add(msg_id)
+    
+    def __contains__(self, msg_id) -> bool:
+        return msg_id in self._ids
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ids)
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def add(self, msg_id: str):
+        """Add (or refresh) an ID, evicting the oldest one when full."""
+        self._ids.pop(msg_id, None)
+        self._ids[msg_id] = None
+        if len(self._ids) > self.max_size:
+            del self._ids[next(iter(self._ids))]
+    
+    def discard(self, msg_id: str):
+        """Remove an ID if present."""
+        self._ids.pop(msg_id, None)
 
 class WhatsAppScanner:
     """Scans WhatsApp groups for messages."""
@@ -30,11 +233,18 @@ class WhatsAppScanner:
         self.playwright = None
         self.browser = None
         self.page: Optional[Page] = None
-        self.seen_message_ids: Set[str] = set()
+        # Message IDs already returned by a live check; catches messages shown again when the
+        # last read element is no longer rendered. Restarts are covered by mark_group_read.
+        self.seen_message_ids: RecentIds = RecentIds(MAX_SEEN_MESSAGE_IDS)
+        # Per group, the WhatsApp data-id of the newest message already read; live checks
+        # only extract the messages below it
+        self._last_seen_data_id: Dict[str, str] = {}
+        # Group whose chat is currently open, so repeat visits can skip navigation
+        self._current_group: Optional[str] = None
     
     async def start(self):
         """Initialize browser and WhatsApp Web."""
-        print("Starting WhatsApp scanner...")
+        print("Starting WhatsApp scanner...", file=sys.stderr)
         
         self.playwright = await async_playwright().start()
         self.browser = await self.playwright.chromium.launch_persistent_context(
@@ -46,7 +256,7 @@ class WhatsAppScanner:
         self.page = self.browser.pages[0] if self.browser.pages else await self.browser.new_page()
         
         # Navigate to WhatsApp Web
-        print("Navigating to WhatsApp Web...")
+        print("Navigating to WhatsApp Web...", file=sys.stderr)
         await self.page.goto("https://web.whatsapp.com", timeout=30000)
         
         # Wait for WhatsApp to load
@@ -54,64 +264,132 @@ class WhatsAppScanner:
     
     async def _wait_for_whatsapp_load(self):
         """Wait for WhatsApp Web to fully load."""
-        print("Waiting for WhatsApp Web to load...")
+        print("Waiting for WhatsApp Web to load...", file=sys.stderr)
         
         try:
             await self.page.wait_for_load_state("networkidle", timeout=30000)
-            await asyncio.sleep(2)
+            
+            # Either the login QR code or the chat list renders once the app has started
+            try:
+                await self.page.wait_for_selector('canvas, [data-testid="chat-list"]', timeout=10000)
+            except PlaywrightTimeoutError:
+                pass  # Checked below
             
             # Check if QR code is present
             qr_present = await self.page.locator('canvas').count() > 0
             
             if qr_present:
-                print("QR code detected. Please scan with your phone...")
-                print("Waiting for login (up to 2 minutes)...")
+                print("QR code detected. Please scan with your phone...", file=sys.stderr)
+                print("Waiting for login (up to 2 minutes)...", file=sys.stderr)
                 
-                # Wait for chat list to appear
-                for _ in range(120):
-                    await asyncio.sleep(1)
-                    if await self.page.locator('[data-testid="chat-list"]').count() > 0:
-                        print("Successfully logged in!")
-                        await asyncio.sleep(3)
-                        return
+                # Wait for chat list to appear (returns as soon as it is rendered)
+                try:
+                    await self.page.wait_for_selector('[data-testid="chat-list"]', timeout=120000)
+                except PlaywrightTimeoutError:
+                    print("WARNING: Timeout waiting for QR scan. Proceeding anyway...", file=sys.stderr)
+                    return
                 
-                print("WARNING: Timeout waiting for QR scan. Proceeding anyway...")
+                print("Successfully logged in!", file=sys.stderr)
+                try:
+                    await self.page.wait_for_load_state("networkidle", timeout=5000)
+                except PlaywrightTimeoutError:
+                    pass  # Chats keep syncing in the background; the list is usable already
             else:
-                print("Already logged in (session restored).")
-                await asyncio.sleep(2)
+                print("Already logged in (session restored).", file=sys.stderr)
         
         except PlaywrightTimeoutError:
-            print("WARNING: Timeout during load. Attempting to continue...")
-            await asyncio.sleep(5)
+            print("WARNING: Timeout during load. Attempting to continue...", file=sys.stderr)
+            try:
+                await self.page.wait_for_selector('[data-testid="chat-list"]', timeout=5000)
+            except PlaywrightTimeoutError:
+                pass
     
-    async def scan_group_history(self, group_name: str, scroll_count: int = 5) -> List[Message]:
+    async def scan_group_history_stream(self, group_name: str, scroll_count: int = 5) -> AsyncIterator[Message]:
         """
-        Scan a group's message history.
+        Scan a group's message history, yielding messages as each scroll pass loads them.
+        
+        Messages already yielded by an earlier pass are skipped, so callers can start
+        analyzing the visible messages while older history is still loading.
         
         Args:
             group_name: Name of the WhatsApp group
             scroll_count: Number of times to scroll up to load history
             
-        Returns:
-            List of Message objects
+        Yields:
+            Message objects, newest screen first
         """
-        print(f"\nScanning group: {group_name}")
+        print(f"\nScanning group: {group_name}", file=sys.stderr)
         
         # Navigate to group
         await self._navigate_to_group(group_name)
         
-        # Scroll to load history
-        print(f"Scrolling {scroll_count} times to load history...")
-        for i in range(scroll_count):
+        yielded_ids = set()
+        read_data_ids = set()
+        misses = 0
+        for i in range(scroll_count + 1):
+            if i > 0:
+                if await self._scroll_history(1):
+                    misses = 0
+                else:
+                    misses += 1
+                    if misses >= NO_GROWTH_LIMIT:
+                        print(f"  Reached the start of the chat after {i}/{scroll_count} scroll pass(es)", file=sys.stderr)
+                        break
+                    continue  # Nothing new rendered, so there is nothing new to extract
+                print(f"  Scroll {i}/{scroll_count}", file=sys.stderr)
+            
+            for msg in await self._extract_messages(group_name, read_data_ids):
+                msg_id = self._get_message_id(msg)
+                if msg_id not in yielded_ids:
+                    yielded_ids.add(msg_id)
+                    yield msg
+        
+        print(f"Extracted {len(yielded_ids)} messages from {group_name}", file=sys.stderr)
+    
+    async def _scroll_history(self, count: int) -> int:
+        """
+        Scroll the open chat up to load older messages.
+        
+        Args:
+            count: Number of scroll passes
+            
+        Returns:
+            Number of passes that loaded older messages
+        """
+        # Scroll in the page and wait for new messages to render, instead of fixed sleeps
+        loaded = await self.page.evaluate(
+            SCROLL_HISTORY_JS, {"count": count, "noGrowthLimit": NO_GROWTH_LIMIT}
+        )
+        if loaded is not None:
+            return loaded
+        
+        # Scroll container not found: fall back to paging up with the keyboard. A page-up
+        # may move through history that is already rendered, so growth can't be used to stop.
+        for _ in range(count):
             await self.page.keyboard.press("PageUp")
             await asyncio.sleep(1)
-            print(f"  Scroll {i+1}/{scroll_count}")
+        return count
+    
+    async def mark_group_read(self, group_name: str) -> int:
+        """
+        Mark the messages currently shown in a group as read, without extracting them.
         
-        # Extract messages
-        messages = await self._extract_messages(group_name)
-        print(f"Extracted {len(messages)} messages from {group_name}")
+        Later scan_group_new_messages calls only return messages that arrive after this.
         
-        return messages
+        Args:
+            group_name: Name of the WhatsApp group
+            
+        Returns:
+            Number of messages marked as read
+        """
+        # Navigate to group
+        await self._navigate_to_group(group_name)
+        
+        result = await self.page.evaluate(NEWEST_DATA_ID_JS)
+        if result["newestId"] is not None:
+            self._last_seen_data_id[group_name] = result["newestId"]
+        
+        return result["count"]
     
     async def scan_group_new_messages(self, group_name: str) -> List[Message]:
         """
@@ -126,8 +404,8 @@ class WhatsAppScanner:
         # Navigate to group
         await self._navigate_to_group(group_name)
         
-        # Extract only new messages
-        all_messages = await self._extract_messages(group_name)
+        # Extract only new messages: the page stops at the newest element read on an earlier check
+        all_messages = await self._extract_messages(group_name, stop_at_seen=True)
         
         # Filter to only new messages
         new_messages = []
@@ -141,57 +419,71 @@ class WhatsAppScanner:
     
     async def _navigate_to_group(self, group_name: str):
         """Navigate to a specific WhatsApp group."""
+        # Escape special characters in group name for CSS selector
+        escaped_group_name = self._escape_css_selector(group_name)
+        
+        # Already in this chat (e.g. live monitoring a single group): nothing to do
+        if self._current_group == group_name:
+            if await self.page.locator(f'#main header span[title="{escaped_group_name}"]').count() > 0:
+                print("  Chat already open", file=sys.stderr)
+                return
+        self._current_group = None
+        
         try:
-            print(f"  Looking for group in chat list...")
-            
-            # Escape special characters in group name for CSS selector
-            escaped_group_name = self._escape_css_selector(group_name)
+            print(f"  Looking for group in chat list...", file=sys.stderr)
             
             # Method 1: Try to find the group directly in the chat list
+            # (a short click timeout replaces a separate count() probe)
             group_in_list = self.page.locator(f'span[title="{escaped_group_name}"]').first
-            if await group_in_list.count() > 0:
-                print(f"  Found group in chat list, clicking...")
-                await group_in_list.click()
-                await asyncio.sleep(3)
+            if await self._try_click(group_in_list, timeout=1500):
+                print(f"  Found group in chat list, clicked", file=sys.stderr)
             else:
                 # Method 2: Use search
-                print(f"  Group not visible, using search...")
+                print(f"  Group not visible, using search...", file=sys.stderr)
                 
-                # Try multiple search box selectors
+                # Try the search box selectors in order of specificity (a union locator
+                # would pick whichever comes first in the DOM, e.g. the compose box)
                 search_selectors = [
                     '[data-testid="chat-list-search"]',
-                    'div[contenteditable="true"]',
-                    '[title="Search input textbox"]'
+                    '[title="Search input textbox"]',
+                    '#side div[contenteditable="true"]'
                 ]
                 
                 search_found = False
                 for selector in search_selectors:
                     search_box = self.page.locator(selector).first
                     if await search_box.count() > 0:
-                        print(f"  Found search box with selector: {selector}")
                         await search_box.click()
-                        await asyncio.sleep(1)
+                        print(f"  Found search box with selector: {selector}", file=sys.stderr)
                         search_found = True
                         break
                 
                 if not search_found:
-                    print(f"  No search box found, trying keyboard shortcut...")
+                    print(f"  No search box found, trying keyboard shortcut...", file=sys.stderr)
                     await self.page.keyboard.press("Control+Alt+/")
-                    await asyncio.sleep(1)
                 
-                # Clear any existing text with select all + delete
-                # Use Command on macOS, Control on other platforms
-                import platform
-                select_all_key = "Meta+a" if platform.system() == "Darwin" else "Control+a"
-                await self.page.keyboard.press(select_all_key)
-                await asyncio.sleep(0.3)
+                # Wait for the search box to take focus before typing into it
+                try:
+                    await self.page.wait_for_function(SEARCH_FOCUSED_JS, timeout=1000)
+                except PlaywrightTimeoutError:
+                    pass  # Type anyway
+                
+                # Clear any existing text with select all + delete (key presses are
+                # delivered in order, so no pause is needed between them)
+                await self.page.keyboard.press(_SELECT_ALL_KEY)
                 await self.page.keyboard.press("Backspace")
-                await asyncio.sleep(0.5)
                 
                 # Type group name
-                print(f"  Typing group name: {group_name}")
+                print(f"  Typing group name: {group_name}", file=sys.stderr)
                 await self.page.keyboard.type(group_name)
-                await asyncio.sleep(3)  # Give time for search results
+                
+                # Wait until the group shows up in the results or WhatsApp reports no match
+                try:
+                    await self.page.wait_for_function(
+                        SEARCH_SETTLED_JS, arg=group_name, timeout=5000
+                    )
+                except PlaywrightTimeoutError:
+                    pass  # Fall through to the result checks below
                 
                 # Check if we got the "No chats, contacts or messages found" message
                 no_results = await self.page.locator('text=/No chats, contacts or messages found/i').count()
@@ -199,78 +491,103 @@ class WhatsAppScanner:
                     raise ValueError(f"No search results found for group '{group_name}'")
                 
                 # Try to click on the first search result
-                print(f"  Looking for first search result...")
+                print(f"  Looking for first search result...", file=sys.stderr)
                 first_result = self.page.locator(f'span[title="{escaped_group_name}"]').first
-                result_count = await first_result.count()
-                
-                if result_count > 0:
-                    print(f"  Clicking on search result...")
-                    await first_result.click()
-                    await asyncio.sleep(2)
+                if await self._try_click(first_result, timeout=1500):
+                    print(f"  Clicked on search result", file=sys.stderr)
                 else:
                     # Fallback: Try pressing Enter
-                    print(f"  Search result not found, trying Enter key...")
+                    print(f"  Search result not found, trying Enter key...", file=sys.stderr)
                     await self.page.keyboard.press("Enter")
-                    await asyncio.sleep(2)
             
-            # Wait for chat to load
-            print(f"  Waiting for chat to load...")
-            await asyncio.sleep(7)  # Give it time to load
+            # Wait for chat to load: the conversation header switches to this group,
+            # then its messages render (an empty chat simply times out the second wait)
+            print(f"  Waiting for chat to load...", file=sys.stderr)
+            try:
+                await self.page.wait_for_selector(f'#main header span[title="{escaped_group_name}"]', timeout=8000)
+                await self.page.wait_for_selector('#main div[data-id]', timeout=3000)
+            except PlaywrightTimeoutError:
+                pass  # The checks below decide whether the chat is usable
             
             # Check if chat loaded by looking for message containers
             # Note: WhatsApp uses div[data-id] for messages, not [data-testid="msg-container"]
             msg_count = await self.page.locator('div[data-id]').count()
             
             if msg_count > 0:
-                print(f"  ✓ Chat loaded successfully (found {msg_count} messages)")
+                print(f"  ✓ Chat loaded successfully (found {msg_count} messages)", file=sys.stderr)
             else:
                 # Could be an empty chat - check if we're at least in a conversation view
                 # by looking for the message input box
                 input_box = await self.page.locator('[data-testid="conversation-compose-box-input"]').count()
                 if input_box > 0:
-                    print(f"  ✓ Chat loaded (empty chat, no messages yet)")
+                    print(f"  ✓ Chat loaded (empty chat, no messages yet)", file=sys.stderr)
                 else:
                     raise ValueError(f"Chat did not load for group '{group_name}'")
             
+            self._current_group = group_name
+            
         except Exception as e:
-            print(f"  ✗ Error navigating to group: {str(e)}")
-            await asyncio.sleep(2)
+            print(f"  ✗ Error navigating to group: {str(e)}", file=sys.stderr)
             raise  # Re-raise the exception to stop processing this group
     
-    async def _extract_messages(self, group_name: str) -> List[Message]:
-        """Extract messages from the current chat."""
+    async def _try_click(self, locator, timeout: float) -> bool:
+        """Click the locator if it shows up within timeout (ms); return whether it was clicked."""
+        try:
+            await locator.click(timeout=timeout)
+            return True
+        except PlaywrightTimeoutError:
+            return False
+    
+    async def _extract_messages(self, group_name: str, seen_data_ids: Optional[MutableSet] = None, stop_at_seen: bool = False) -> List[Message]:
+        """
+        Extract messages from the current chat.
+        
+        Args:
+            group_name: Name of the WhatsApp group
+            seen_data_ids: WhatsApp data-ids to skip; the data-ids read by this call are added to it
+            stop_at_seen: Only read messages below the newest one read by the previous live
+                check of this group (the chat must not have been scrolled to older history since)
+        
+        Returns:
+            List of Message objects
+        """
         messages = []
         
         try:
-            # Get all message containers
-            print(f"  Looking for message containers...")
-            message_elements = await self.page.locator('[data-testid="msg-container"]').all()
-            print(f"  Found {len(message_elements)} messages with [data-testid='msg-container']")
-            
-            if not message_elements or len(message_elements) == 0:
-                # Fallback to alternative selector
-                print(f"  Trying alternative selector: div[data-id]")
-                message_elements = await self.page.locator('div[data-id]').all()
-                print(f"  Found {len(message_elements)} messages with div[data-id]")
+            # Read every message container in one evaluate call instead of
+            # several locator round-trips per message
+            print(f"  Looking for message containers...", file=sys.stderr)
+            stop_at_id = self._last_seen_data_id.get(group_name) if stop_at_seen else None
+            result = await self.page.evaluate(
+                EXTRACT_MESSAGES_JS, {"skipIds": list(seen_data_ids or ()), "stopAtId": stop_at_id}
+            )
+            records = result["records"]
+            if stop_at_seen and result["newestId"] is not None:
+                self._last_seen_data_id[group_name] = result["newestId"]
+            print(f"  Found {result['total']} messages with {result['selector']}", file=sys.stderr)
             
-            skipped_own = 0
+            skipped_own = result["ownCount"]
+            # Everything the page didn't return or count as own was read by an earlier call
+            skipped_seen = result["total"] - len(records) - skipped_own
             skipped_empty = 0
             errors = 0
             
-            for elem in message_elements:
+            for record in records:
                 try:
-                    # Check if it's our own message (skip it)
-                    if await self._is_own_message(elem):
-                        skipped_own += 1
-                        continue
+                    if record is None:
+                        raise ValueError("Could not read message element")
                     
-                    sender = await self._extract_sender(elem)
-                    text = await self._extract_text(elem)
-                    timestamp = await self._extract_timestamp(elem)
-                    phone = await self._extract_phone_number(elem)
+                    if seen_data_ids is not None and record["dataId"] is not None:
+                        seen_data_ids.add(record["dataId"])
+                    
+                    sender = self._extract_sender(record)
+                    text = self._extract_text(record)
+                    timestamp = self._extract_timestamp(record)
+                    date = self._extract_date(record)
+                    phone = self._extract_phone_number(record)
                     
                     if text and text.strip():
-                        messages.append(Message(sender, text, timestamp, phone))
+                        messages.append(Message(sender, text, timestamp, phone, group_name, date))
                     else:
                         skipped_empty += 1
                 
@@ -278,156 +595,94 @@ class WhatsAppScanner:
                     errors += 1
                     continue
             
-            print(f"  Processing summary: {len(messages)} kept, {skipped_own} own messages, {skipped_empty} empty, {errors} errors")
+            print(f"  Processing summary: {len(messages)} kept, {skipped_seen} already read, {skipped_own} own messages, {skipped_empty} empty, {errors} errors", file=sys.stderr)
         
         except Exception as e:
-            print(f"Error extracting messages: {str(e)}")
+            print(f"Error extracting messages: {str(e)}", file=sys.stderr)
         
         return messages
     
-    async def _is_own_message(self, element) -> bool:
-        """Check if message is from current user."""
-        try:
-            # Check for outgoing message indicator
-            classes = await element.get_attribute('class') or ''
-            if 'message-out' in classes:
-                return True
-            
-            # More specific check: look for the green checkmark or double checkmark
-            # which indicates sent messages
-            checkmarks = await element.locator('[data-icon="msg-check"], [data-icon="msg-dblcheck"]').count()
-            if checkmarks > 0:
-                return True
-            
-            return False
-        except:
-            return False
-    
-    async def _extract_sender(self, element) -> str:
-        """Extract sender name from message element."""
-        try:
-            # Method 1: Look for sender name in the aria-label attribute
-            aria_label_elem = await element.locator('span[aria-label^="Maybe "]').first.count()
-            if aria_label_elem > 0:
-                aria_elem = element.locator('span[aria-label^="Maybe "]').first
-                aria_text = await aria_elem.inner_text()
-                if aria_text and len(aria_text) > 0:
-                    return aria_text.strip()
-            
-            # Method 2: Look for copyable-text with data-pre-plain-text attribute
-            full_html = await element.inner_html()
-            pre_text_match = re.search(r'data-pre-plain-text="[^"]*\]\s*([^:]+):', full_html)
-            if pre_text_match:
-                sender = pre_text_match.group(1).strip()
-                # Decode HTML entities
-                sender = sender.replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
-                # Make sure it's not a phone number
-                if sender and len(sender) > 0 and not re.match(r'^[\d\s\-+()]+$', sender):
-                    return sender
-            
-            # Method 3: Look for sender name span (but not phone button)
-            sender_spans = await element.locator('span[dir="auto"]').all()
-            for span in sender_spans:
-                try:
-                    # Skip if it's the phone button
-                    span_class = await span.get_attribute('class') or ''
-                    span_role = await span.get_attribute('role') or ''
-                    if '_ahx_' in span_class or span_role == 'button':
-                        continue
-                    
-                    text = await span.inner_text()
-                    text = text.strip()
-                    # Filter out timestamps, phone numbers, emojis, and very short/long strings
-                    if text and 2 < len(text) < 50:
-                        # Skip if it's a timestamp
-                        if re.match(r'^\d{1,2}:\d{2}', text):
-                            continue
-                        # Skip if it's mostly digits (phone number)
-                        if re.match(r'^[\d\s\-+()]+$', text):
-                            continue
-                        # Must have letters
-                        if any(c.isalpha() for c in text):
-                            return text
-                except:
+    def _extract_sender(self, record: Dict) -> str:
+        """Extract sender name from a message record."""
+        # Method 1: Sender from the data-pre-plain-text attribute ("[time, date] Sender: "),
+        # which names saved contacts on nearly every message
+        pre_text_match = _RE_PRE_TEXT_SENDER.match(record["prePlainText"])
+        if pre_text_match:
+            sender = pre_text_match.group(1).strip()
+            # Make sure it's not a phone number
+            if sender and len(sender) > 0 and not _RE_DIGITS_ONLY.match(sender):
+                return sender
+        
+        # Method 2: Sender name from the aria-label span (unsaved contacts)
+        if record["ariaSender"]:
+            return record["ariaSender"]
+        
+        # Method 3: Look for sender name span (phone buttons are already excluded)
+        for text in record["senderSpans"]:
+            # Filter out timestamps, phone numbers, emojis, and very short/long strings
+            if text and 2 < len(text) < 50:
+                # Skip if it's a timestamp
+                if _RE_TS_PREFIX.match(text):
                     continue
-            
-            return "Unknown"
-        except Exception as e:
-            return "Unknown"
-    
-    async def _extract_text(self, element) -> str:
-        """Extract message text from element."""
-        try:
-            # Try specific text selectors
-            text_elem = element.locator('span.selectable-text').first
-            if await text_elem.count() > 0:
-                text = await text_elem.inner_text()
-                text = text.strip()
-                if text:
+                # Skip if it's mostly digits (phone number)
+                if _RE_DIGITS_ONLY.match(text):
+                    continue
+                # Must have letters
+                if any(c.isalpha() for c in text):
                     return text
-            
-            # Fallback to full text
-            full_text = await element.inner_text()
-            full_text = full_text.strip()
-            return full_text if full_text else ""
-        except:
-            return ""
+        
+        return "Unknown"
     
-    async def _extract_timestamp(self, element) -> str:
-        """Extract timestamp from message."""
-        try:
-            full_text = await element.inner_text()
-            time_pattern = r'\[?(\d{1,2}:\d{2})\]?'
-            matches = re.findall(time_pattern, full_text)
-            if matches:
-                return matches[-1]
-            return "Unknown"
-        except:
-            return "Unknown"
+    def _extract_text(self, record: Dict) -> str:
+        """Extract message text from a message record."""
+        # Prefer the message body span, fall back to the full element text
+        return record["text"] or record["fullText"]
     
-    async def _extract_phone_number(self, element) -> str:
-        """Extract phone number from message element."""
-        try:
-            # Method 1: Look for phone number in button span with class _ahx_
-            phone_button = element.locator('span._ahx_[role="button"]').first
-            if await phone_button.count() > 0:
-                phone = await phone_button.inner_text()
-                phone = phone.strip().replace(' ', '').replace('-', '')
-                if phone:
-                    return phone
-            
-            # Method 2: Extract from data-pre-plain-text attribute
-            full_html = await element.inner_html()
-            pre_text_match = re.search(r'data-pre-plain-text="[^"]*\]\s*([^:]+):', full_html)
-            if pre_text_match:
-                potential_phone = pre_text_match.group(1).strip()
-                # Check if it matches phone pattern
-                if re.match(r'^[\d\s\-+()]+$', potential_phone):
-                    return potential_phone.replace(' ', '').replace('-', '')
-            
-            # Method 3: Look in message text
-            text = await self._extract_text(element)
-            patterns = [
-                r'\+972[-\s]?\d{1,2}[-\s]?\d{3}[-\s]?\d{4}',  # +972-XX-XXX-XXXX
-                r'0\d{1,2}[-\s]?\d{3}[-\s]?\d{4}',  # 0XX-XXX-XXXX
-                r'\d{10}',  # 10 digits together
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, text)
-                if match:
-                    phone = match.group(0)
-                    # Clean up formatting
-                    phone = phone.replace(' ', '').replace('-', '')
-                    return phone
-            
-            return "N/A"
-        except:
+    def _extract_timestamp(self, record: Dict) -> str:
+        """Extract timestamp from a message record."""
+        # The last time in the element is the message's own timestamp
+        timestamp = "Unknown"
+        for match in _RE_TIME.finditer(record["fullText"]):
+            timestamp = match.group(1)
+        return timestamp
+    
+    def _extract_date(self, record: Dict) -> str:
+        """Extract the message date from a message record's data-pre-plain-text."""
+        date_match = _RE_PRE_TEXT_DATE.match(record["prePlainText"])
+        return date_match.group(1).strip() if date_match else ""
+    
+    def _extract_phone_number(self, record: Dict) -> str:
+        """Extract phone number from a message record."""
+        # Method 1: Phone number in the button span with class _ahx_
+        phone = record["phoneButton"].translate(_PHONE_SEPARATORS)
+        if phone:
+            return phone
+        
+        # Method 2: Extract from data-pre-plain-text attribute
+        pre_text_match = _RE_PRE_TEXT_SENDER.match(record["prePlainText"])
+        if pre_text_match:
+            potential_phone = pre_text_match.group(1).strip()
+            # Check if it matches phone pattern
+            if _RE_DIGITS_ONLY.match(potential_phone):
+                return potential_phone.translate(_PHONE_SEPARATORS)
+        
+        # Method 3: Look in message text
+        text = self._extract_text(record)
+        if not _RE_ANY_PHONE.search(text):
             return "N/A"
+        for pattern in _RE_PHONES:
+            match = pattern.search(text)
+            if match:
+                phone = match.group(0)
+                # Clean up formatting
+                phone = phone.translate(_PHONE_SEPARATORS)
+                return phone
+        
+        return "N/A"
     
     def _get_message_id(self, message: Message) -> str:
-        """Generate a unique ID for a message."""
-        return hash(f"{message.sender}_{message.text[:50]}_{message.timestamp}")
+        """Generate a unique ID for a message (stable across runs)."""
+        return _message_id(message.group_name, message.sender, message.text, message.date, message.timestamp)
     
     def _escape_css_selector(self, text: str) -> str:
         """
@@ -1,12 +1,38 @@
 """
 GUI display for WhatsApp Padel Match Tracker with Hebrew RTL support.
 """
+import re
 import tkinter as tk
+from collections import Counter
 from tkinter import ttk
-from typing import List
+from typing import Dict, Iterable, List, Optional, Tuple
 from datetime import datetime, timedelta
 from test_apps.padel import Match
 
+_TODAY_WORDS = frozenset({"today", "היום", "tod", "tdy"})
+_TOMORROW_WORDS = frozenset({"tomorrow", "מחר", "tmrw", "tmr"})
+
+# Day of week names (English and Hebrew) mapped to datetime.weekday() numbers
+_DAY_NUMBERS = {
+    "monday": 0, "mon": 0,
+    "tuesday": 1, "tue": 1,
+    "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3,
+    "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5,
+    "sunday": 6, "sun": 6,
+    "ראשון": 6, "יום ראשון": 6,
+    "שני": 0, "יום שני": 0,
+    "שלישי": 1, "יום שלישי": 1,
+    "רביעי": 2, "יום רביעי": 2,
+    "חמישי": 3, "יום חמישי": 3,
+    "שישי": 4, "יום שישי": 4,
+    "שבת": 5, "יום שבת": 5
+}
+
+# Longest names first so e.g. "sunday" wins over "sun" at the same position
+_DAY_PATTERN = re.compile("|".join(re.escape(name) for name in sorted(_DAY_NUMBERS, key=len, reverse=True)))
+
 class MatchDisplayWindow:
     """GUI window to display matches in a Hebrew RTL table."""
     
@@ -20,6 +46,8 @@ class MatchDisplayWindow:
         
         # Store matches
         self.matches: List[Match] = []
+        self.confidence_counts: Counter = Counter()
+        self._display_cache: Dict[int, Tuple[tuple, tuple]] = {}
         
         # Privacy setting
         self.show_private_info = tk.BooleanVar(value=False)
@@ -142,56 +170,73 @@ class MatchDisplayWindow:
     
     def add_match(self, match: Match):
         """Add a match to the display."""
-        self.matches.append(match)
-        self._refresh_display()
+        self.add_matches((match,))
+    
+    def add_matches(self, matches: Iterable[Match]):
+        """Add several matches to the display, updating the summary once."""
+        show_private = self.show_private_info.get()
+        now = datetime.now()  # One reference time for every relative date in the batch
+        for match in matches:
+            self.matches.append(match)
+            self.confidence_counts[match.confidence] += 1
+            
+            # Newest match goes on top; existing rows are left untouched
+            self._add_match_to_tree(match, index=0, show_private=show_private, now=now)
+        self._update_summary()
     
     def _refresh_display(self):
         """Refresh the entire display with current privacy settings."""
-        # Clear current display
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        # Clear current display (one Tcl call for all rows)
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
         
         # Re-add all matches
+        show_private = self.show_private_info.get()
+        now = datetime.now()
         for match in reversed(self.matches):  # Reversed so newest is first
-            self._add_match_to_tree(match)
+            self._add_match_to_tree(match, show_private=show_private, now=now)
         
         # Update summary
         self._update_summary()
     
-    def _add_match_to_tree(self, match: Match):
-        """Add a single match to the tree with current privacy settings."""
+    def _row_values(self, match: Match, now: Optional[datetime] = None) -> Tuple[tuple, tuple]:
+        """Compute a match's column values, as (redacted, with private info)."""
         # Get confidence symbol
         symbol = self._get_confidence_symbol(match.confidence)
         confidence_text = f"{match.confidence} {symbol}"
         
         # Format match date/time with actual dates
-        match_datetime = self._format_match_datetime_with_actual_date(match)
+        match_datetime = self._format_match_datetime_with_actual_date(match, now)
         
         # Get location
         location = match.analysis.location if match.analysis and match.analysis.location else "-"
         
-        # Apply privacy redaction if needed
-        show_private = self.show_private_info.get()
-        phone_display = match.phone_number if show_private else "***"
-        sender_display = match.sender if show_private else "***"
+        redacted = (confidence_text, match_datetime, location, "***", "***", match.group_name, match.timestamp)
+        private = (confidence_text, match_datetime, location, match.phone_number, match.sender,
+                   match.group_name, match.timestamp)
+        return redacted, private
+    
+    def _add_match_to_tree(self, match: Match, index="end", show_private: Optional[bool] = None,
+                           now: Optional[datetime] = None):
+        """Add a single match to the tree (at the given row index) with current privacy settings."""
+        # Column values are formatted once per match and reused on every refresh
+        cached = self._display_cache.get(id(match))
+        if cached is None:
+            cached = self._display_cache[id(match)] = self._row_values(match, now)
+        redacted, private = cached
         
-        # Insert into treeview
+        # Apply privacy redaction if needed
+        if show_private is None:
+            show_private = self.show_private_info.get()
         self.tree.insert(
             '',
-            'end',
-            values=(
-                confidence_text,
-                match_datetime,
-                location,
-                phone_display,
-                sender_display,
-                match.group_name,
-                match.timestamp
-            ),
+            index,
+            values=private if show_private else redacted,
             tags=(match.confidence,)
         )
     
-    def _format_match_datetime_with_actual_date(self, match: Match) -> str:
+    def _format_match_datetime_with_actual_date(self, match: Match, now: Optional[datetime] = None) -> str:
         """
         Format the match date and time, converting relative dates to actual dates.
         Uses the message timestamp to calculate actual dates from relative terms.
@@ -203,7 +248,7 @@ class MatchDisplayWindow:
         time_str = match.analysis.match_time or ""
         
         # Convert relative date to actual date
-        actual_date = self._convert_relative_to_actual_date(date_str, match.timestamp)
+        actual_date = self._convert_relative_to_actual_date(date_str, match.timestamp, now)
         
         # Combine date and time
         if actual_date and time_str:
@@ -215,13 +260,14 @@ class MatchDisplayWindow:
         else:
             return "לא ידוע"
     
-    def _convert_relative_to_actual_date(self, date_str: str, message_timestamp: str) -> str:
+    def _convert_relative_to_actual_date(self, date_str: str, message_timestamp: str, now: Optional[datetime] = None) -> str:
         """
         Convert relative date (today, tomorrow) to actual date.
         
         Args:
             date_str: The date string from AI (e.g., "today", "tomorrow", "Sunday")
             message_timestamp: The timestamp when the message was sent (HH:MM format)
+            now: Reference time (defaults to the current time)
             
         Returns:
             Formatted date string (DD/MM or day name)
@@ -230,55 +276,27 @@ class MatchDisplayWindow:
             return ""
         
         date_lower = date_str.lower()
-        now = datetime.now()
+        if now is None:
+            now = datetime.now()
         
         # Handle "today" / "היום"
-        if date_lower in ["today", "היום", "tod", "tdy"]:
+        if date_lower in _TODAY_WORDS:
             return now.strftime("%d/%m")
         
         # Handle "tomorrow" / "מחר"
-        elif date_lower in ["tomorrow", "מחר", "tmrw", "tmr"]:
+        elif date_lower in _TOMORROW_WORDS:
             tomorrow = now + timedelta(days=1)
             return tomorrow.strftime("%d/%m")
         
-        # Handle day of week names (English)
-        day_names = {
-            "monday": 0, "mon": 0,
-            "tuesday": 1, "tue": 1,
-            "wednesday": 2, "wed": 2,
-            "thursday": 3, "thu": 3,
-            "friday": 4, "fri": 4,
-            "saturday": 5, "sat": 5,
-            "sunday": 6, "sun": 6
-        }
-        
-        # Handle day of week names (Hebrew)
-        hebrew_days = {
-            "ראשון": 6, "יום ראשון": 6,
-            "שני": 0, "יום שני": 0,
-            "שלישי": 1, "יום שלישי": 1,
-            "רביעי": 2, "יום רביעי": 2,
-            "חמישי": 3, "יום חמישי": 3,
-            "שישי": 4, "יום שישי": 4,
-            "שבת": 5, "יום שבת": 5
-        }
-        
         # Check for day names
-        for day_name, day_num in day_names.items():
-            if day_name in date_lower:
-                days_ahead = (day_num - now.weekday()) % 7
-                if days_ahead == 0:
-                    days_ahead = 7  # Next occurrence
-                target_date = now + timedelta(days=days_ahead)
-                return target_date.strftime("%d/%m")
-        
-        for day_name, day_num in hebrew_days.items():
-            if day_name in date_str:
-                days_ahead = (day_num - now.weekday()) % 7
-                if days_ahead == 0:
-                    days_ahead = 7  # Next occurrence
-                target_date = now + timedelta(days=days_ahead)
-                return target_date.strftime("%d/%m")
+        day_match = _DAY_PATTERN.search(date_lower)
+        if day_match:
+            day_num = _DAY_NUMBERS[day_match.group(0)]
+            days_ahead = (day_num - now.weekday()) % 7
+            if days_ahead == 0:
+                days_ahead = 7  # Next occurrence
+            target_date = now + timedelta(days=days_ahead)
+            return target_date.strftime("%d/%m")
         
         # If it's already a specific date format, return as is
         return date_str
@@ -290,8 +308,11 @@ class MatchDisplayWindow:
     def clear_matches(self):
         """Clear all matches from the display."""
         self.matches.clear()
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.confidence_counts.clear()
+        self._display_cache.clear()
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
         self._update_summary()
         self._clear_details()
     
@@ -347,9 +368,9 @@ class MatchDisplayWindow:
     def _update_summary(self):
         """Update the summary label."""
         total = len(self.matches)
-        high = sum(1 for m in self.matches if m.confidence == "HIGH")
-        medium = sum(1 for m in self.matches if m.confidence == "MEDIUM")
-        low = sum(1 for m in self.matches if m.confidence == "LOW")
+        high = self.confidence_counts["HIGH"]
+        medium = self.confidence_counts["MEDIUM"]
+        low = self.confidence_counts["LOW"]
         
         summary = f"סה\"כ התאמות: {total} (גבוה: {high}, בינוני: {medium}, נמוך: {low})"
         self.summary_label.config(text=summary)
@@ -8,17 +8,23 @@ import time
 import asyncio
 import argparse
 from pathlib import Path
-from typing import List
+from typing import AsyncIterable, AsyncIterator, List
 from colorama import Fore, Style
+from pydantic import BaseModel
+from tqdm import tqdm
 
 # Add parent directory to path to import from src
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
 
 from src.config import config, ScenarioDefinition
-from src.agent import get_agent_for_scenario
+from src.agent import close_agents, get_agent_for_scenario, warm_agents
+from src.pipeline import analyze_stream
 from test_apps.padel import MatchDisplayWindow, MatchTracker, Match
 from src.whatsapp_scanner import WhatsAppScanner, Message
 
+# Seconds to collect matches before drawing them, so bursts cost one window update
+GUI_FLUSH_INTERVAL = 0.1
+
 def print_banner():
     """Print application banner."""
     print(f"\n{Fore.CYAN}{'='*80}")
@@ -28,84 +34,107 @@ def print_banner():
 def print_config_info():
     """Print configuration information."""
     print(f"{Fore.YELLOW}Configuration:{Style.RESET_ALL}")
-    print(f"  Ollama URL: {config.ollama_base_url}")
-    print(f"  Model: {config.ollama_model}")
+    print(f"  Backend: {config.inference_backend} ({config.inference_base_url})")
+    print(f"  Model: {config.ollama_model} (preload keep alive: {config.ollama_preload_keep_alive})")
     print(f"  User Level: {config.user_preferences.level}")
     print(f"  Time Window: {config.user_preferences.time_window[0]}:00-{config.user_preferences.time_window[1]}:00")
     print()
 
-async def analyze_messages(messages: List[Message], group_name: str, scenario: ScenarioDefinition, tracker: MatchTracker, gui_window=None):
+async def analyze_messages(messages: AsyncIterable[Message], group_name: str, scenario: ScenarioDefinition, tracker: MatchTracker, gui_window=None, concurrency: int = 8, batch_size: int = 8):
     """
-    Analyze messages with AI agent and add matches to tracker.
+    Analyze messages with AI agent as they arrive and add matches to tracker.
     
     Args:
-        messages: List of messages to analyze
+        messages: Async stream of messages to analyze
         group_name: Name of the WhatsApp group
         scenario: ScenarioDefinition guiding the analysis
         tracker: MatchTracker instance to store matches
         gui_window: Optional GUI window to update with matches
+        concurrency: Maximum number of in-flight requests to the model
+        batch_size: Number of messages sent to the model in a single request
     """
-    if not messages:
-        return
-    
     agent = get_agent_for_scenario(scenario)
+    loop = asyncio.get_running_loop()
+    gui_pending: List[Match] = []
+    gui_flush = None
     
-    print(f"\n{Fore.CYAN}Analyzing {len(messages)} messages from {group_name}...{Style.RESET_ALL}")
+    def _flush_gui():
+        nonlocal gui_flush
+        gui_flush = None
+        if gui_pending:
+            gui_window.add_matches(gui_pending)
+            gui_pending.clear()
+            gui_window.update()
     
-    for i, msg in enumerate(messages, 1):
-        print(f"  [{i}/{len(messages)}] Analyzing message from {msg.sender}...", end="\r")
+    def _on_analysis(i: int, msg: Message, analysis: BaseModel):
+        nonlocal gui_flush
         
-        try:
-            analysis = await agent.analyze_message(msg.text)
-            if analysis is None:
-                continue
-            
-            # Check if this is a game invite
-            if analysis.is_game_invite:
-                match = Match(
-                    timestamp=msg.timestamp,
-                    group_name=group_name,
-                    sender=msg.sender,
-                    phone_number=msg.phone_number,
-                    message=msg.text,
-                    confidence=analysis.confidence,
-                    analysis=analysis
-                )
-                tracker.add_match(match)
-                
-                if gui_window:
-                    gui_window.add_match(match)
-                    gui_window.update()
-                
-                color = tracker.get_confidence_color(analysis.confidence)
-                symbol = tracker.get_confidence_symbol(analysis.confidence)
-                print(f"  [{i}/{len(messages)}] {color}MATCH FOUND{Style.RESET_ALL} "
-                      f"({analysis.confidence} {symbol}) - {msg.sender}")
+        # Check if this is a game invite
+        if not analysis.is_game_invite:
+            return
         
-        except Exception as e:
-            print(f"  [{i}/{len(messages)}] Error analyzing message: {str(e)}")
+        match = Match(
+            timestamp=msg.timestamp,
+            group_name=group_name,
+            sender=msg.sender,
+            phone_number=msg.phone_number,
+            message=msg.text,
+            confidence=analysis.confidence,
+            analysis=analysis
+        )
+        tracker.add_match(match)
+        
+        if gui_window:
+            gui_pending.append(match)
+            if gui_flush is None:
+                gui_flush = loop.call_later(GUI_FLUSH_INTERVAL, _flush_gui)
+        
+        color = tracker.get_confidence_color(analysis.confidence)
+        symbol = tracker.get_confidence_symbol(analysis.confidence)
+        tqdm.write(f"  [{i + 1}] {color}MATCH FOUND{Style.RESET_ALL} "
+                   f"({analysis.confidence} {symbol}) - {msg.sender}")
     
-    print(f"  {Fore.GREEN}✓{Style.RESET_ALL} Analysis complete for {group_name}")
+    print(f"\n{Fore.CYAN}Analyzing messages from {group_name}...{Style.RESET_ALL}")
+    
+    received = await analyze_stream(
+        agent, messages, _on_analysis,
+        concurrency=concurrency, batch_size=batch_size, description=f"  {group_name}"
+    )
+    
+    if gui_flush is not None:
+        gui_flush.cancel()
+    if gui_window:
+        _flush_gui()
+    
+    print(f"  {Fore.GREEN}✓{Style.RESET_ALL} Analysis complete for {group_name} ({received} messages)")
 
-async def scan_history_mode(groups: List[str], scroll_count: int):
+async def _iterate(messages: List[Message]) -> AsyncIterator[Message]:
+    """Adapt an already collected list of messages to analyze_messages."""
+    for msg in messages:
+        yield msg
+
+async def scan_history_mode(groups: List[str], scroll_count: int, concurrency: int = 8, batch_size: int = 8):
     """Scan historical messages from groups."""
     print(f"{Fore.YELLOW}Mode: Historical Scan{Style.RESET_ALL}")
     print(f"Groups to scan: {', '.join(groups)}")
-    print(f"Scroll count: {scroll_count}\n")
+    print(f"Scroll count: {scroll_count}")
+    print(f"Concurrency: {concurrency}")
+    print(f"Batch size: {batch_size}\n")
     
     scanner = WhatsAppScanner()
     tracker = MatchTracker()
     gui_window = MatchDisplayWindow(title="סריקת היסטוריה - מציאת משחקי פאדל")
     
     try:
+        await warm_agents(config.get_scenario_for_group(group) for group in groups)
         await scanner.start()
         
         for group in groups:
             scenario = config.get_scenario_for_group(group)
             if not scenario or scenario.name != 'padel':
                 continue
-            messages = await scanner.scan_group_history(group, scroll_count)
-            await analyze_messages(messages, group, scenario, tracker, gui_window)
+            messages = scanner.scan_group_history_stream(group, scroll_count)
+            await analyze_messages(messages, group, scenario, tracker, gui_window, concurrency, batch_size)
         
         print(f"\n{Fore.CYAN}{'='*80}{Style.RESET_ALL}")
         print(f"{Fore.GREEN}✓ Scan complete! Opening results window...{Style.RESET_ALL}")
@@ -120,9 +149,10 @@ async def scan_history_mode(groups: List[str], scroll_count: int):
         print(f"\n{Fore.RED}Error: {str(e)}{Style.RESET_ALL}")
         gui_window.destroy()
     finally:
+        close_agents()
         await scanner.cleanup()
 
-async def monitor_live_mode(groups: List[str], interval: int):
+async def monitor_live_mode(groups: List[str], interval: int, concurrency: int = 8, batch_size: int = 8):
     """Monitor groups for new messages in real-time."""
     print(f"{Fore.YELLOW}Mode: Live Monitoring{Style.RESET_ALL}")
     print(f"Groups to monitor: {', '.join(groups)}")
@@ -134,14 +164,12 @@ async def monitor_live_mode(groups: List[str], interval: int):
     gui_window = MatchDisplayWindow(title="ניטור חי - מציאת משחקי פאדל")
     
     try:
+        await warm_agents(config.get_scenario_for_group(group) for group in groups)
         await scanner.start()
         
         print(f"{Fore.CYAN}Loading existing messages...{Style.RESET_ALL}")
         for group in groups:
-            messages = await scanner.scan_group_history(group, scroll_count=3)
-            for msg in messages:
-                msg_id = scanner._get_message_id(msg)
-                scanner.seen_message_ids.add(msg_id)
+            await scanner.mark_group_read(group)
         
         print(f"{Fore.GREEN}✓ Loaded existing messages. Now monitoring...{Style.RESET_ALL}\n")
         
@@ -150,17 +178,31 @@ async def monitor_live_mode(groups: List[str], interval: int):
             check_count += 1
             print(f"\n{Fore.CYAN}Check #{check_count} - {time.strftime('%H:%M:%S')}{Style.RESET_ALL}")
             
-            for group in groups:
-                scenario = config.get_scenario_for_group(group)
-                if not scenario or scenario.name != 'padel':
-                    continue
-                new_messages = await scanner.scan_group_new_messages(group)
-                
-                if new_messages:
-                    print(f"  Found {len(new_messages)} new message(s) in {group}")
-                    await analyze_messages(new_messages, group, scenario, tracker, gui_window)
-                else:
-                    print(f"  No new messages in {group}")
+            # The next group is checked in the browser while the previous one is analyzed
+            found_queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+            
+            async def produce():
+                try:
+                    for group in groups:
+                        scenario = config.get_scenario_for_group(group)
+                        if not scenario or scenario.name != 'padel':
+                            continue
+                        new_messages = await scanner.scan_group_new_messages(group)
+                        
+                        if new_messages:
+                            print(f"  Found {len(new_messages)} new message(s) in {group}")
+                            await found_queue.put((group, scenario, new_messages))
+                        else:
+                            print(f"  No new messages in {group}")
+                finally:
+                    await found_queue.put(None)
+            
+            async def consume():
+                while (item := await found_queue.get()) is not None:
+                    group, scenario, new_messages = item
+                    await analyze_messages(_iterate(new_messages), group, scenario, tracker, gui_window, concurrency, batch_size)
+            
+            await asyncio.gather(produce(), consume())
             
             try:
                 gui_window.update()
@@ -178,6 +220,7 @@ async def monitor_live_mode(groups: List[str], interval: int):
         print(f"\n{Fore.RED}Error: {str(e)}{Style.RESET_ALL}")
         gui_window.destroy()
     finally:
+        close_agents()
         await scanner.cleanup()
 
 def main():
@@ -195,9 +238,15 @@ def main():
     
     parser.add_argument('--scrolls', type=int, default=5)
     parser.add_argument('--interval', type=int, default=60)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--no-cache', action='store_true')
     
     args = parser.parse_args()
     
+    if args.no_cache:
+        config.use_response_cache = False
+    
     print_banner()
     print_config_info()
     
@@ -217,9 +266,9 @@ def main():
     
     try:
         if args.mode == 'scan-history':
-            asyncio.run(scan_history_mode(padel_groups, args.scrolls))
+            asyncio.run(scan_history_mode(padel_groups, args.scrolls, args.concurrency, args.batch_size))
         elif args.mode == 'monitor-live':
-            asyncio.run(monitor_live_mode(padel_groups, args.interval))
+            asyncio.run(monitor_live_mode(padel_groups, args.interval, args.concurrency, args.batch_size))
     except Exception as e:
         print(f"\n{Fore.RED}Unexpected error: {str(e)}{Style.RESET_ALL}")
         import traceback
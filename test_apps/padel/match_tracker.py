@@ -1,116 +1,230 @@
 """
 Match tracking for the padel scenario.
 """
-from typing import List
-from colorama import Fore, Style, init
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List
+from colorama import Fore, Style, just_fix_windows_console
 from test_apps.padel import Match
 
-# Initialize colorama for colored console output
-init(autoreset=True)
+# Let older Windows consoles render ANSI colors; elsewhere stdout is left unwrapped
+just_fix_windows_console()
+
+# Confidence level -> (color, symbol)
+_CONF_STYLES = {
+    "HIGH": (Fore.GREEN, "✓"),
+    "MEDIUM": (Fore.YELLOW, "~"),
+    "LOW": (Fore.RED, "✗")
+}
+_DEFAULT_CONF_STYLE = (Fore.WHITE, "?")
+
+# Column widths
+_COL_TIME = 10
+_COL_GROUP = 20
+_COL_SENDER = 15
+_COL_PHONE = 15
+_COL_CONF = 15
+
+_WIDTH = 80  # Full table width
+
+class _NoColor:
+    """Stands in for colorama's Fore/Style when output is not a terminal."""
+    
+    def __getattr__(self, name: str) -> str:
+        return ""
+
+_NO_COLOR = _NoColor()
+
+def _row_template(color: str, reset: str, conf_text: str) -> str:
+    """Build the table row format string with the confidence cell filled in, in the given color."""
+    conf_cell = f"{conf_text:<{_COL_CONF}}".replace("{", "{{").replace("}", "}}")
+    return (
+        f"{{time:<{_COL_TIME}}} "
+        f"{{group:<{_COL_GROUP}}} "
+        f"{{sender:<{_COL_SENDER}}} "
+        f"{{phone:<{_COL_PHONE}}} "
+        f"{color}{conf_cell}{reset}"
+    )
+
+@dataclass(slots=True, frozen=True)
+class _TableStyle:
+    """Prebuilt pieces of the match table; static lines end in a newline."""
+    banner_top: str
+    banner_bottom: str
+    no_matches: str
+    header: str
+    separator: str
+    footer: str
+    rows: Dict[str, str]  # Confidence level -> row format string
+    default_color: str  # Confidence cell color for unknown levels
+    reset: str
+    preview: str  # Format string taking {preview}
+    reasoning: str  # Format string taking {reasoning}
+    summary: str  # Format string taking {total}, {high}, {medium} and {low}
+
+def _table_style(color: bool) -> _TableStyle:
+    """Build the table pieces, with or without ANSI color codes."""
+    fore, style = (Fore, Style) if color else (_NO_COLOR, _NO_COLOR)
+    return _TableStyle(
+        banner_top=f"\n{fore.CYAN}{'=' * _WIDTH}\n",
+        banner_bottom=f"{'=' * _WIDTH}{style.RESET_ALL}\n",
+        no_matches=f"\n{fore.YELLOW}No matches found yet.{style.RESET_ALL}\n\n",
+        header=(
+            f"{fore.CYAN}"
+            f"{'Time':<{_COL_TIME}} "
+            f"{'Group':<{_COL_GROUP}} "
+            f"{'Sender':<{_COL_SENDER}} "
+            f"{'Phone':<{_COL_PHONE}} "
+            f"{'Confidence':<{_COL_CONF}}"
+            f"{style.RESET_ALL}\n"
+        ),
+        separator=f"{fore.CYAN}{'-' * _WIDTH}{style.RESET_ALL}\n",
+        footer=f"{fore.CYAN}{'=' * _WIDTH}{style.RESET_ALL}\n\n",
+        rows={
+            confidence: _row_template(conf_color if color else "", style.RESET_ALL, f"{confidence} {symbol}")
+            for confidence, (conf_color, symbol) in _CONF_STYLES.items()
+        },
+        default_color=fore.WHITE,
+        reset=style.RESET_ALL,
+        preview=f"  {fore.WHITE}→ {{preview}}{style.RESET_ALL}\n",
+        reasoning=f"  {fore.LIGHTBLACK_EX}  {{reasoning}}{style.RESET_ALL}\n",
+        summary=(
+            f"Total matches: {{total}} "
+            f"({fore.GREEN}{{high}} HIGH{style.RESET_ALL}, "
+            f"{fore.YELLOW}{{medium}} MEDIUM{style.RESET_ALL}, "
+            f"{fore.RED}{{low}} LOW{style.RESET_ALL})\n"
+        ),
+    )
+
+_COLOR_TABLE = _table_style(color=True)
+_PLAIN_TABLE = _table_style(color=False)
 
 class MatchTracker:
     """Tracks and displays potential padel game matches for the GUI helpers."""
     
     def __init__(self):
         self.matches: List[Match] = []
+        self.confidence_counts: Counter = Counter()
+        # Escape codes are left out when the table goes to a file or pipe
+        self._use_color = sys.stdout.isatty()
+        self._table = _COLOR_TABLE if self._use_color else _PLAIN_TABLE
+        # Matches are only ever appended, so each one's table row (and details, when
+        # first shown) is rendered once
+        self._rows: List[str] = []
+        self._details: List[str] = []
+        self._displayed = 0  # Rows already written by display_matches/display_new_matches
     
     def add_match(self, match: Match):
         """Add a new match to the tracker."""
         self.matches.append(match)
+        self.confidence_counts[match.confidence] += 1
     
     def get_confidence_color(self, confidence: str) -> str:
         """Get the color code for a confidence level."""
-        colors = {
-            "HIGH": Fore.GREEN,
-            "MEDIUM": Fore.YELLOW,
-            "LOW": Fore.RED
-        }
-        return colors.get(confidence, Fore.WHITE)
+        return _CONF_STYLES.get(confidence, _DEFAULT_CONF_STYLE)[0]
     
     def get_confidence_symbol(self, confidence: str) -> str:
         """Get a symbol for confidence level."""
-        symbols = {
-            "HIGH": "✓",
-            "MEDIUM": "~",
-            "LOW": "✗"
-        }
-        return symbols.get(confidence, "?")
+        return _CONF_STYLES.get(confidence, _DEFAULT_CONF_STYLE)[1]
     
-    def display_matches(self, title: str = "PADEL MATCH TRACKER"):
-        """Display matches in a formatted console table (used for debugging)."""
+    def display_matches(self, title: str = "PADEL MATCH TRACKER", verbose: bool = True):
+        """
+        Display matches in a formatted console table (used for debugging).
+        
+        Args:
+            title: Title shown above the table
+            verbose: Show each match's message preview and reasoning under its row
+        """
+        table = self._table
+        
+        # The whole table is built first and written with a single call
+        out: List[str] = [table.banner_top, f"{title:^{_WIDTH}}\n", table.banner_bottom]
+        
         if not self.matches:
-            print(f"\\n{Fore.CYAN}{'='*80}")
-            print(f"{title:^80}")
-            print(f"{'='*80}{Style.RESET_ALL}")
-            print(f"\\n{Fore.YELLOW}No matches found yet.{Style.RESET_ALL}\\n")
+            out.append(table.no_matches)
+            sys.stdout.write("".join(out))
             return
         
         # Print header
-        print(f"\\n{Fore.CYAN}{'='*80}")
-        print(f"{title:^80}")
-        print(f"{'='*80}{Style.RESET_ALL}\\n")
+        out.append("\n")
+        out.append(table.header)
+        out.append(table.separator)
         
-        # Column widths
-        col_time = 10
-        col_group = 20
-        col_sender = 15
-        col_phone = 15
-        col_conf = 15
+        out.extend(self._row_fragments(0, verbose))
+        self._displayed = len(self.matches)
         
-        header = (
-            f"{Fore.CYAN}"
-            f"{'Time':<{col_time}} "
-            f"{'Group':<{col_group}} "
-            f"{'Sender':<{col_sender}} "
-            f"{'Phone':<{col_phone}} "
-            f"{'Confidence':<{col_conf}}"
-            f"{Style.RESET_ALL}"
-        )
-        print(header)
-        print(f"{Fore.CYAN}{'-'*80}{Style.RESET_ALL}")
-        
-        for match in self.matches:
-            color = self.get_confidence_color(match.confidence)
-            symbol = self.get_confidence_symbol(match.confidence)
-            time_str = match.timestamp[:col_time-1]
-            group_str = match.group_name[:col_group-1]
-            sender_str = match.sender[:col_sender-1]
-            phone_str = match.phone_number[:col_phone-1]
-            conf_str = f"{match.confidence} {symbol}"
-            
-            row = (
-                f"{time_str:<{col_time}} "
-                f"{group_str:<{col_group}} "
-                f"{sender_str:<{col_sender}} "
-                f"{phone_str:<{col_phone}} "
-                f"{color}{conf_str:<{col_conf}}{Style.RESET_ALL}"
+        out.append(table.separator)
+        counts = self.confidence_counts
+        out.append(table.summary.format(
+            total=len(self.matches), high=counts["HIGH"], medium=counts["MEDIUM"], low=counts["LOW"]
+        ))
+        out.append(table.footer)
+        sys.stdout.write("".join(out))
+    
+    def display_new_matches(self, verbose: bool = True):
+        """Display only the rows of matches added since the last display, without the table frame."""
+        if len(self.matches) > self._displayed:
+            sys.stdout.write("".join(self._row_fragments(self._displayed, verbose)))
+            self._displayed = len(self.matches)
+    
+    def _row_fragments(self, start: int, verbose: bool) -> List[str]:
+        """Rendered rows of the matches from index start on, each followed by its details if verbose."""
+        rows = self._render_rows()[start:]
+        if not verbose:
+            return rows
+        details = self._render_details()[start:]
+        return [fragment for pair in zip(rows, details) for fragment in pair]
+    
+    def _render_rows(self) -> List[str]:
+        """Render the table rows of matches added since the last call; return all rows."""
+        table = self._table
+        matches = self.matches
+        append = self._rows.append
+        get_template = table.rows.get
+        for i in range(len(self._rows), len(matches)):
+            match = matches[i]
+            confidence = match.confidence
+            template = get_template(confidence)
+            if template is None:
+                # Unknown level: build a one-off template for its cell
+                conf_text = f"{confidence} {_DEFAULT_CONF_STYLE[1]}"
+                template = _row_template(table.default_color, table.reset, conf_text)
+            row = template.format(
+                time=match.timestamp[:_COL_TIME-1],
+                group=match.group_name[:_COL_GROUP-1],
+                sender=match.sender[:_COL_SENDER-1],
+                phone=match.phone_number[:_COL_PHONE-1]
             )
-            print(row)
-            message_preview = match.message.replace('\\n', ' ')[:70]
-            if len(match.message) > 70:
+            append(f"{row}\n")
+        return self._rows
+    
+    def _render_details(self) -> List[str]:
+        """Render the preview and reasoning lines of matches added since the last call; return all."""
+        matches = self.matches
+        append = self._details.append
+        preview_format = self._table.preview.format
+        reasoning_format = self._table.reasoning.format
+        for i in range(len(self._details), len(matches)):
+            match = matches[i]
+            message = match.message
+            analysis = match.analysis
+            # Slice before replacing so long messages aren't copied in full
+            message_preview = message[:70].replace('\n', ' ')
+            if len(message) > 70:
                 message_preview += "..."
-            print(f"  {Fore.WHITE}→ {message_preview}{Style.RESET_ALL}")
-            if match.analysis:
-                print(f"  {Fore.LIGHTBLACK_EX}  {match.analysis.reasoning}{Style.RESET_ALL}")
-            print()
-        
-        print(f"{Fore.CYAN}{'-'*80}{Style.RESET_ALL}")
-        high_count = sum(1 for m in self.matches if m.confidence == "HIGH")
-        medium_count = sum(1 for m in self.matches if m.confidence == "MEDIUM")
-        low_count = sum(1 for m in self.matches if m.confidence == "LOW")
-        
-        summary = (
-            f"Total matches: {len(self.matches)} "
-            f"({Fore.GREEN}{high_count} HIGH{Style.RESET_ALL}, "
-            f"{Fore.YELLOW}{medium_count} MEDIUM{Style.RESET_ALL}, "
-            f"{Fore.RED}{low_count} LOW{Style.RESET_ALL})"
-        )
-        print(summary)
-        print(f"{Fore.CYAN}{'='*80}{Style.RESET_ALL}\\n")
+            preview = preview_format(preview=message_preview)
+            reasoning = reasoning_format(reasoning=analysis.reasoning) if analysis else ""
+            append(f"{preview}{reasoning}\n")
+        return self._details
     
     def clear(self):
         """Clear all matches."""
         self.matches.clear()
+        self.confidence_counts.clear()
+        self._rows.clear()
+        self._details.clear()
+        self._displayed = 0
     
     def count(self) -> int:
         """Get the number of matches."""